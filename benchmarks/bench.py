@@ -0,0 +1,247 @@
+"""
+Benchmarks of the library's hot paths against the local stub api (see stub_server.py).
+
+	python -m benchmarks.bench                      # run, print and store the results
+	python -m benchmarks.bench --latency 0.02       # simulate a 20ms network round trip
+	python -m benchmarks.bench --compare baseline   # flag regressions against a stored run
+	python -m benchmarks.bench --http2              # over HTTP/2 (Http2Transport, needs httpx[http2])
+
+`import_robinhood` times a cold `import robinhood` in fresh interpreters.
+Every benchmark reports its latency (mean, p50, p95, seconds per call), throughput
+(calls per second), round trips (requests served by the stub per call) and the connections opened.
+Results are stored as json in benchmarks/results/<label>.json.
+
+Timings only compare between runs of the same machine and settings: against a run stored
+elsewhere (like the committed baseline) only the round trips, connections and eager modules
+are compared. Store a local baseline first (`--label local`) to also guard the latencies.
+"""
+from argparse import ArgumentParser
+from json import dumps, loads
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+from robinhood import Trader
+from robinhood.detail.common import concurrent_map
+from robinhood.transport import Http2Transport
+from benchmarks.stub_server import StubApi, StubServer, Http2StubServer, StubTransport
+
+results_dir = os.path.join(os.path.dirname(__file__), 'results')
+
+# a benchmark slower than its stored mean by this ratio is reported as a regression
+regression_ratio = 1.25
+
+# modules `import robinhood` must not load, they are imported by the code paths that use them
+lazy_modules = ['pandas', 'numpy', 'dateutil', 'six']
+
+_import_script = '''
+import sys, time
+started = time.perf_counter()
+import robinhood
+print(time.perf_counter() - started, ','.join(m for m in sys.argv[1:] if m in sys.modules))
+'''
+
+
+def _percentile(values, q):
+	values = sorted(values)
+	return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def measure(function, api, iterations, warmup=3):
+	"""Times `iterations` calls of `function()`, counting the requests the stub served
+		and the connections opened (warmup calls included)"""
+	connections = api.connections
+	for _ in range(warmup):
+		function()
+
+	requests = api.requests
+	timings = []
+	started = time.perf_counter()
+	for _ in range(iterations):
+		call_started = time.perf_counter()
+		function()
+		timings.append(time.perf_counter() - call_started)
+	elapsed = time.perf_counter() - started
+
+	return {
+		'iterations': iterations,
+		'mean': statistics.fmean(timings),
+		'p50': _percentile(timings, 0.50),
+		'p95': _percentile(timings, 0.95),
+		'throughput': iterations / elapsed,
+		'round_trips': (api.requests - requests) / iterations,
+		'connections': api.connections - connections,
+	}
+
+
+def measure_import(runs=10):
+	"""Times `import robinhood` in `runs` fresh interpreters"""
+	root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+	timings = []
+	loaded = set()
+	for _ in range(runs):
+		output = subprocess.check_output([sys.executable, '-c', _import_script] + lazy_modules, cwd=root, text=True)
+		seconds, _, modules = output.strip().partition(' ')
+		timings.append(float(seconds))
+		loaded.update(filter(None, modules.split(',')))
+
+	return {
+		'iterations': runs,
+		'mean': statistics.fmean(timings),
+		'p50': _percentile(timings, 0.50),
+		'p95': _percentile(timings, 0.95),
+		'throughput': runs / sum(timings),
+		'round_trips': 0.0,
+		'eager_modules': sorted(loaded),
+	}
+
+
+def benchmarks(trader, iterations):
+	"""{name: (function, iterations)} of every benchmark, on a trader connected to the stub"""
+	crypto_order = trader.crypto.buy('btc', quantity=0.001, price=7000.0)
+	symbols = ['aapl', 'msft', 'amzn', 'goog', 'tsla']
+
+	def poll_orderbook(polls=10):
+		# `watch_orderbook` without the console rendering and the sleeps
+		for _ in range(polls):
+			book = trader.orderbook('aapl')
+			book['asks'][:15], book['bids'][:15]
+
+	return {
+		'quote': (lambda: trader.quote('aapl'), iterations),
+		'quote_cached': (lambda: trader.quote('aapl', max_staleness=60), iterations),
+		'quotes_5': (lambda: trader.quotes(['aapl', 'msft', 'amzn', 'goog', 'tsla']), iterations),
+		# one request per symbol, `max_workers` concurrent requests
+		'quotes_concurrent': (lambda: concurrent_map(trader.quotes, [[s] for s in symbols * 4], trader.max_workers),
+							  max(iterations // 10, 5)),
+		'historical_quotes': (lambda: trader.historical_quotes('aapl', '5minute', 'week'), max(iterations // 10, 5)),
+		# before the orders benchmarks add to the order list
+		'orders': (lambda: trader.orders(), iterations),
+		'orders_frame': (lambda: trader.orders_frame(), max(iterations // 10, 5)),
+		'place_order': (lambda: trader.buy('aapl', 1, price=100.0), iterations),
+		'place_order_market': (lambda: trader.buy('aapl', 1), iterations),
+		'crypto_order_update': (lambda: crypto_order.update(), iterations),
+		'orderbook_polling_10': (poll_orderbook, max(iterations // 10, 5)),
+	}
+
+
+def run(iterations=100, latency=0.0, orders=500, only=None, http2=False):
+	"""Runs the benchmarks on a fresh stub, returns {name: result}"""
+	Server = Http2StubServer if http2 else StubServer
+	with Server(StubApi(orders=orders), latency=latency) as server:
+		trader = Trader()
+		inner = Http2Transport(trader.session, http1=False) if http2 else None
+		trader.transport = StubTransport(server.url, trader.session, inner)
+		trader.rate_limiter = None
+		results = {}
+		if not only or 'import_robinhood' in only:
+			results['import_robinhood'] = measure_import()
+		for name, (function, count) in benchmarks(trader, iterations).items():
+			if only and name not in only:
+				continue
+			results[name] = measure(function, server.api, count)
+		return results
+
+
+def _label():
+	try:
+		return subprocess.check_output(['git', 'describe', '--always', '--dirty'],
+									   cwd=os.path.dirname(__file__), text=True).strip()
+	except (OSError, subprocess.CalledProcessError):
+		return time.strftime('%Y%m%d-%H%M%S')
+
+
+def save(results, label, settings):
+	os.makedirs(results_dir, exist_ok=True)
+	path = os.path.join(results_dir, label + '.json')
+	document = {
+		'label': label,
+		'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+		'python': platform.python_version(),
+		'machine': platform.machine(),
+		'host': platform.node(),
+		'settings': settings,
+		'results': results,
+	}
+	with open(path, 'w') as file:
+		file.write(dumps(document, indent=2) + '\n')
+	return path
+
+
+def load(label):
+	path = label if label.endswith('.json') else os.path.join(results_dir, label + '.json')
+	with open(path, 'r') as file:
+		return loads(file.read())
+
+
+def comparable_timings(baseline, settings):
+	"""True if the stored run was measured on this machine with the same settings"""
+	return baseline.get('host') == platform.node() and baseline.get('settings') == settings
+
+
+def compare(results, baseline, ratio=regression_ratio, timings=True):
+	"""Returns [(name, metric, baseline, current)] of the regressions against a stored run,
+		latencies are only compared with `timings`"""
+	regressions = []
+	for name, result in results.items():
+		previous = baseline['results'].get(name)
+		if not previous:
+			continue
+		if timings and result['mean'] > previous['mean'] * ratio:
+			regressions.append((name, 'mean', previous['mean'], result['mean']))
+		if result['round_trips'] > previous['round_trips']:
+			regressions.append((name, 'round_trips', previous['round_trips'], result['round_trips']))
+		if result.get('connections', 0) > previous.get('connections', result.get('connections', 0)):
+			regressions.append((name, 'connections', previous['connections'], result['connections']))
+		if len(result.get('eager_modules', [])) > len(previous.get('eager_modules', [])):
+			regressions.append((name, 'eager_modules', len(previous['eager_modules']), len(result['eager_modules'])))
+	return regressions
+
+
+def report(results):
+	lines = [f"{'benchmark':<24}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'calls/s':>12}{'round trips':>13}{'connections':>13}"]
+	for name, r in results.items():
+		lines.append(f"{name:<24}{r['mean'] * 1e3:>10.3f}{r['p50'] * 1e3:>10.3f}{r['p95'] * 1e3:>10.3f}"
+					 f"{r['throughput']:>12.1f}{r['round_trips']:>13.2f}{r.get('connections', 0):>13}")
+	return '\n'.join(lines)
+
+
+def main(args=None):
+	parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+	parser.add_argument('--iterations', type=int, default=100)
+	parser.add_argument('--latency', type=float, default=0.0, help='simulated network latency (seconds)')
+	parser.add_argument('--orders', type=int, default=500, help='orders preloaded in the stub')
+	parser.add_argument('--only', nargs='*', help='benchmarks to run')
+	parser.add_argument('--label', default=None, help='name of the stored results (git describe by default)')
+	parser.add_argument('--compare', default=None, help='label or path of stored results to compare with')
+	parser.add_argument('--http2', action='store_true', help='send the requests over HTTP/2')
+	parser.add_argument('--no-save', action='store_true')
+	args = parser.parse_args(args)
+
+	settings = {'iterations': args.iterations, 'latency': args.latency, 'orders': args.orders, 'http2': args.http2}
+	results = run(args.iterations, args.latency, args.orders, args.only, args.http2)
+	print(report(results))
+
+	if not args.no_save:
+		print('saved', save(results, args.label or _label(), settings))
+
+	if args.compare:
+		baseline = load(args.compare)
+		for name in results:
+			if name not in baseline['results']:
+				print(f'NOT COMPARED {name}: missing from {args.compare}, store a new baseline to guard it')
+		timings = comparable_timings(baseline, settings)
+		if not timings:
+			print(f'timings not compared: {args.compare} was measured on another machine or with other settings')
+		regressions = compare(results, baseline, timings=timings)
+		for name, metric, previous, current in regressions:
+			print(f'REGRESSION {name} {metric}: {previous:.6g} -> {current:.6g}')
+		return 1 if regressions else 0
+	return 0
+
+
+if __name__ == '__main__':
+	raise SystemExit(main())
@@ -0,0 +1,394 @@
+"""
+Local stub of the robinhood api used by the benchmarks.
+
+Serves quotes, historicals, instruments, orders (paginated, with order placement),
+pricebook snapshots, accounts and the crypto (nummus) orders from memory over real http,
+so the benchmarks measure the library's own overhead plus a local round trip.
+Urls in the payloads keep robinhood's hosts, `StubTransport` maps them to the stub.
+`Http2StubServer` serves the same api over cleartext HTTP/2 (requires the `h2` package).
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+from json import dumps, loads
+import socket
+import threading
+import time
+import uuid
+
+import requests
+
+from robinhood import endpoints, crypto_endpoints
+
+api = endpoints.api_url
+nummus = crypto_endpoints.crypto_base_url.rstrip('/')
+account_url = api + '/accounts/5QR00000/'
+
+
+def _instrument(symbol):
+	instrument_id = str(uuid.uuid5(uuid.NAMESPACE_URL, symbol))
+	return {
+		'id': instrument_id,
+		'url': api + f'/instruments/{instrument_id}/',
+		'symbol': symbol,
+		'simple_name': symbol.title(),
+		'tradeable': True,
+		'tradability': 'tradable',
+		'state': 'active',
+		'type': 'stock',
+		'min_tick_size': None,
+		'fractional_tradability': 'tradable',
+	}
+
+
+def _quote(instrument, price):
+	return {
+		'symbol': instrument['symbol'],
+		'instrument': instrument['url'],
+		'ask_price': '%.6f' % (price + 0.05),
+		'ask_size': 100,
+		'bid_price': '%.6f' % (price - 0.05),
+		'bid_size': 100,
+		'last_trade_price': '%.6f' % price,
+		'last_extended_hours_trade_price': None,
+		'previous_close': '%.6f' % (price - 1),
+		'adjusted_previous_close': '%.6f' % (price - 1),
+		'previous_close_date': '2020-04-27',
+		'trading_halted': False,
+		'has_traded': True,
+		'updated_at': '2020-04-28T20:00:00Z',
+	}
+
+
+def _order(payload, crypto=False):
+	order_id = str(uuid.uuid4())
+	now = time.strftime('%Y-%m-%dT%H:%M:%S.000000Z', time.gmtime())
+	order = dict(payload, id=order_id, state='queued', cumulative_quantity='0', executions=[],
+				 created_at=now, updated_at=now, last_transaction_at=now, average_price=None, fees='0.00')
+	if crypto:
+		order['cancel_url'] = nummus + f'/orders/{order_id}/cancel/'
+	else:
+		order['url'] = api + f'/orders/{order_id}/'
+		order['cancel'] = api + f'/orders/{order_id}/cancel/'
+	return order
+
+
+class StubApi:
+	"""
+	In memory state of the stub, shared by the server's threads.
+
+	Args:
+		symbols: stock symbols known to the stub
+		orders: orders preloaded in the (stock and crypto) order lists
+		page_size: orders per page of the orders endpoints
+		historicals: bars per historicals response
+	"""
+
+	def __init__(self, symbols=('AAPL', 'MSFT', 'AMZN', 'GOOG', 'TSLA'), orders=500, page_size=100, historicals=390):
+		self.page_size = page_size
+		self.historicals = historicals
+		self.instruments = {symbol: _instrument(symbol) for symbol in symbols}
+		self.by_id = {instrument['id']: instrument for instrument in self.instruments.values()}
+		self.orders = {'api': [], 'nummus': []}
+		self.requests = 0
+		self.connections = 0
+		self._lock = threading.Lock()
+
+		symbol = symbols[0]
+		for i in range(orders):
+			self.orders['api'].append(_order({
+				'account': account_url, 'instrument': self.instruments[symbol]['url'], 'symbol': symbol,
+				'side': 'buy', 'type': 'limit', 'trigger': 'immediate', 'time_in_force': 'gfd',
+				'price': '100.00', 'quantity': '1'}))
+			self.orders['nummus'].append(_order({
+				'currency_pair_id': crypto_endpoints.crypto_pairs['BTC'], 'side': 'buy', 'type': 'market',
+				'time_in_force': 'gtc', 'price': '7000.00', 'quantity': '0.001'}, crypto=True))
+
+	def dispatch(self, method, target, raw_body=None):
+		"""Returns (status, json) of a request to `target` ('/<api|nummus>/<path>?<query>')"""
+		host, _, path = target.lstrip('/').partition('/')
+		parts = urlsplit('/' + path)
+		body = None
+		if raw_body:
+			raw = raw_body.decode()
+			try:
+				body = loads(raw)
+			except ValueError:
+				body = dict((k, v[0]) for k, v in parse_qs(raw).items())
+		return self.handle(method, host, parts.path, parse_qs(parts.query), body)
+
+	def handle(self, method, host, path, query, body):
+		"""Returns (status, json) of a request"""
+		with self._lock:
+			self.requests += 1
+		parts = [part for part in path.split('/') if part]
+
+		if host == 'nummus':
+			if parts == ['orders']:
+				if method == 'POST':
+					return self._place('nummus', body, crypto=True)
+				return 200, self._page('nummus', nummus + '/orders/', query)
+			if parts[:1] == ['orders'] and len(parts) == 2:
+				return self._get_order('nummus', parts[1])
+			if parts == ['accounts']:
+				return 200, {'next': None, 'results': [{'id': 'c1', 'status': 'active'}]}
+			return 404, {'detail': 'Not found.'}
+
+		if parts == ['quotes']:
+			symbols = query.get('symbols', [''])[0].split(',')
+			return 200, {'results': [_quote(self.instruments[s], 100.0) if s in self.instruments else None
+									 for s in symbols]}
+		if parts[:2] == ['marketdata', 'historicals']:
+			return 200, {'symbol': parts[2], 'historicals': self._bars()}
+		if parts[:3] == ['marketdata', 'forex', 'quotes']:
+			return 200, {'symbol': 'BTCUSD', 'id': parts[3], 'ask_price': '7000.50', 'bid_price': '6999.50',
+						 'mark_price': '7000.00', 'high_price': '7100.00', 'low_price': '6900.00', 'open_price': '6950.00'}
+		if parts[:3] == ['marketdata', 'pricebook', 'snapshots']:
+			return 200, self._book()
+		if parts == ['instruments']:
+			symbol = query.get('symbol', [''])[0]
+			return 200, {'next': None, 'results': [self.instruments[symbol]] if symbol in self.instruments else []}
+		if parts[:1] == ['instruments'] and len(parts) == 2:
+			return (200, self.by_id[parts[1]]) if parts[1] in self.by_id else (404, {'detail': 'Not found.'})
+		if parts == ['orders']:
+			if method == 'POST':
+				return self._place('api', body)
+			return 200, self._page('api', api + '/orders/', query)
+		if parts[:1] == ['orders'] and len(parts) == 2:
+			return self._get_order('api', parts[1])
+		if parts == ['accounts']:
+			return 200, {'next': None, 'results': [{'url': account_url, 'account_number': '5QR00000',
+													'cash': '100000.00', 'buying_power': '100000.00'}]}
+		return 404, {'detail': 'Not found.'}
+
+	def _page(self, host, url, query):
+		orders = self.orders[host]
+		start = int(query.get('cursor', ['0'])[0])
+		stop = start + self.page_size
+		with self._lock:
+			results = orders[start:stop]
+			more = stop < len(orders)
+		return {'previous': None, 'next': url + f'?cursor={stop}' if more else None, 'results': results}
+
+	def _get_order(self, host, order_id):
+		with self._lock:
+			order = next((order for order in self.orders[host] if order['id'] == order_id), None)
+		return (200, order) if order else (404, {'detail': 'Not found.'})
+
+	def _place(self, host, body, crypto=False):
+		order = _order(body, crypto)
+		with self._lock:
+			# newest first, as robinhood lists them
+			self.orders[host].insert(0, order)
+		return 201, order
+
+	def _bars(self):
+		return [{'begins_at': '2020-04-28T%02d:%02d:00Z' % (13 + i // 60 % 8, i % 60), 'open_price': '100.00',
+				 'close_price': '100.10', 'high_price': '100.20', 'low_price': '99.90', 'volume': 1000,
+				 'session': 'reg', 'interpolated': False} for i in range(self.historicals)]
+
+	def _book(self, depth=25):
+		def level(price):
+			return {'price': {'amount': '%.2f' % price, 'currency_code': 'USD'}, 'quantity': 100, 'side': None}
+		return {'asks': [level(100.05 + i * 0.01) for i in range(depth)],
+				'bids': [level(99.95 - i * 0.01) for i in range(depth)]}
+
+
+class _Handler(BaseHTTPRequestHandler):
+	protocol_version = 'HTTP/1.1'
+	disable_nagle_algorithm = True
+
+	def _respond(self, method):
+		length = int(self.headers.get('Content-Length') or 0)
+		raw_body = self.rfile.read(length) if length else None
+
+		latency = self.server.latency
+		if latency:
+			time.sleep(latency)
+
+		status, json = self.server.api.dispatch(method, self.path, raw_body)
+		content = dumps(json).encode()
+		self.send_response(status)
+		self.send_header('Content-Type', 'application/json')
+		self.send_header('Content-Length', str(len(content)))
+		self.end_headers()
+		if method != 'HEAD':
+			self.wfile.write(content)
+
+	def setup(self):
+		BaseHTTPRequestHandler.setup(self)
+		with self.server.api._lock:
+			self.server.api.connections += 1
+
+	def do_HEAD(self):
+		self._respond('HEAD')
+
+	def do_GET(self):
+		self._respond('GET')
+
+	def do_POST(self):
+		self._respond('POST')
+
+	def log_message(self, format, *args):
+		pass
+
+
+class StubServer:
+	"""
+	Runs a StubApi on a local port in a background thread.
+
+	Args:
+		api: the StubApi served (a default one if None)
+		latency: seconds added to every response, simulates the network
+	"""
+
+	def __init__(self, api=None, latency=0.0, port=0):
+		self.api = api or StubApi()
+		self._server = ThreadingHTTPServer(('127.0.0.1', port), _Handler)
+		self._server.daemon_threads = True
+		self._server.api = self.api
+		self._server.latency = latency
+		self._thread = None
+
+	@property
+	def url(self):
+		host, port = self._server.server_address
+		return f'http://{host}:{port}'
+
+	def start(self):
+		self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+		self._thread.start()
+		return self
+
+	def stop(self):
+		self._server.shutdown()
+		self._server.server_close()
+
+	def __enter__(self):
+		return self.start()
+
+	def __exit__(self, *args):
+		self.stop()
+
+
+class Http2StubServer:
+	"""
+	Runs a StubApi over cleartext HTTP/2 (h2c, prior knowledge) on a local port.
+	Every stream is answered from its own thread, concurrent requests are multiplexed
+	over their connection. Same interface as StubServer.
+	"""
+
+	def __init__(self, api=None, latency=0.0, port=0):
+		import h2.connection  # noqa: F401, fail early without the h2 package
+
+		self.api = api or StubApi()
+		self.latency = latency
+		self._socket = socket.create_server(('127.0.0.1', port))
+		self._thread = None
+
+	@property
+	def url(self):
+		host, port = self._socket.getsockname()[:2]
+		return f'http://{host}:{port}'
+
+	def start(self):
+		self._thread = threading.Thread(target=self._serve, daemon=True)
+		self._thread.start()
+		return self
+
+	def stop(self):
+		self._socket.close()
+
+	def __enter__(self):
+		return self.start()
+
+	def __exit__(self, *args):
+		self.stop()
+
+	def _serve(self):
+		while True:
+			try:
+				connection, _ = self._socket.accept()
+			except OSError:
+				return
+			with self.api._lock:
+				self.api.connections += 1
+			threading.Thread(target=self._connection, args=(connection,), daemon=True).start()
+
+	def _connection(self, sock):
+		import h2.config
+		import h2.connection
+		import h2.events
+
+		sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+		conn = h2.connection.H2Connection(h2.config.H2Configuration(client_side=False, header_encoding='utf-8'))
+		# guards `conn` and the socket writes, notified when the peer opens its flow control window
+		window = threading.Condition()
+		requests = {}
+
+		with window:
+			conn.initiate_connection()
+			sock.sendall(conn.data_to_send())
+
+		while True:
+			try:
+				data = sock.recv(65536)
+			except OSError:
+				data = b''
+			if not data:
+				break
+			with window:
+				events = conn.receive_data(data)
+				for event in events:
+					if isinstance(event, h2.events.RequestReceived):
+						requests[event.stream_id] = (dict(event.headers), [])
+					elif isinstance(event, h2.events.DataReceived):
+						requests[event.stream_id][1].append(event.data)
+						conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+					elif isinstance(event, (h2.events.WindowUpdated, h2.events.RemoteSettingsChanged)):
+						window.notify_all()
+					if isinstance(event, h2.events.StreamEnded):
+						headers, chunks = requests.pop(event.stream_id)
+						threading.Thread(target=self._respond, daemon=True,
+										 args=(sock, conn, window, event.stream_id, headers, b''.join(chunks))).start()
+				sock.sendall(conn.data_to_send())
+		sock.close()
+
+	def _respond(self, sock, conn, window, stream_id, headers, raw_body):
+		if self.latency:
+			time.sleep(self.latency)
+		status, json = self.api.dispatch(headers[':method'], headers[':path'], raw_body)
+		content = dumps(json).encode()
+
+		try:
+			with window:
+				conn.send_headers(stream_id, [(':status', str(status)), ('content-type', 'application/json'),
+											  ('content-length', str(len(content)))])
+				while True:
+					size = min(conn.local_flow_control_window(stream_id), conn.max_outbound_frame_size, len(content))
+					if size or not content:
+						conn.send_data(stream_id, content[:size], end_stream=size == len(content))
+						content = content[size:]
+						sock.sendall(conn.data_to_send())
+						if not content:
+							return
+					else:
+						window.wait()
+		except Exception:
+			pass  # the client went away
+
+
+class StubTransport:
+	"""Trader transport sending robinhood urls to a stub server,
+		through `inner` (a transport, ex: Http2Transport) or a keep-alive requests session"""
+
+	def __init__(self, server_url, session=None, inner=None):
+		self.session = session or requests.session()
+		self.inner = inner or self.session
+		self.hosts = [(api, server_url + '/api'), (nummus, server_url + '/nummus')]
+
+	def request(self, method, url, **kwargs):
+		for host, local in self.hosts:
+			if url.startswith(host):
+				url = local + url[len(host):]
+				break
+		return self.inner.request(method, url, **kwargs)
@@ -1,9 +1,11 @@
-import six
-
-if six.PY3:
-    from .trader import Trader
-else:
-    from .trader import Trader
+from .trader import Trader
 
 from . import endpoints
 from . import crypto_endpoints
+from .portfolio import PortfolioSnapshot
+from .detail.ratelimit import RateLimiter
+from .detail.metrics import Metrics
+from .detail.tracing import Tracer
+from .detail.httpcache import ResponseCache
+from .paper import PaperBroker
+from .transport import RecordingTransport, ReplayTransport, Http2Transport
@@ -0,0 +1,46 @@
+"""
+Compact json store of a login (tokens, expiry, device token), the lightweight
+alternative to pickling the whole Trader with `save_session`.
+"""
+import json
+import os
+import time
+
+fields = ['access_token', 'refresh_token', 'expires_at', 'device_token']
+
+
+class CredentialStore:
+	"""
+	Json file holding {'access_token', 'refresh_token', 'expires_at' (unix time), 'device_token'}.
+	The file is written atomically and readable by its owner only.
+	"""
+
+	def __init__(self, path):
+		self.path = path
+
+	def load(self):
+		"""The stored credentials, None if there are none"""
+		if not os.path.exists(self.path):
+			return None
+		with open(self.path, 'r') as file:
+			return json.load(file)
+
+	def save(self, credentials):
+		tmp_path = self.path + '.tmp'
+		# a leftover tmp file would keep its (possibly wider) permissions, create a fresh one
+		if os.path.exists(tmp_path):
+			os.remove(tmp_path)
+		descriptor = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+		with os.fdopen(descriptor, 'w') as file:
+			json.dump({key: credentials.get(key) for key in fields}, file)
+		os.replace(tmp_path, self.path)
+
+	def clear(self):
+		if os.path.exists(self.path):
+			os.remove(self.path)
+
+
+def is_expired(credentials, margin=60):
+	"""True if the access token expires within `margin` seconds (or its expiry is unknown)"""
+	expires_at = credentials.get('expires_at')
+	return not credentials.get('access_token') or not expires_at or expires_at - margin <= time.time()
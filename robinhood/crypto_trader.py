@@ -1,15 +1,24 @@
 from . import crypto_endpoints
 from .crypto_endpoints import crypto_pairs as _crypto_pairs
-from .order import CryptoOrder
+from .order import CryptoOrder, final_states
 from .quote import CryptoQuote, HistoricalQuote
+from .detail.frames import ColumnBuffer
+from .detail.common import concurrent_map
+from .detail.cache import QuoteCache
+from .detail.tracing import trace_methods
+from .markets import poll as _poll, watch_orders as _watch_orders
 import uuid
-from json import dumps
-import pandas as pd
 
+@trace_methods(lambda crypto: crypto.tracer)
 class CryptoTrader:
 
 	def __init__(self, trader):
 		self.trader = trader
+		self._quote_cache = QuoteCache()
+
+	@property
+	def tracer(self):
+		return self.trader.tracer
 
 	@property
 	def _req_post(self):
@@ -19,13 +28,26 @@ class CryptoTrader:
 	def _req_get(self):
 		return self.trader._req_get
 
+	@property
+	def _req_get_pages(self):
+		return self.trader._req_get_pages
+
 	@property
 	def _fprice(self):
 		return self.trader._fprice
 
-	def quote(self, symbol):
-		json = self._req_get(crypto_endpoints.quotes(symbol))
-		return CryptoQuote(json)
+	def quote(self, symbol, max_staleness=None):
+		"""max_staleness: seconds, a cached quote at most this old is returned without a request"""
+		symbol = symbol.upper()
+		quote = self._quote_cache.fresh(symbol, max_staleness)
+		if quote is None:
+			json = self._req_get(crypto_endpoints.quotes(symbol))
+			quote = self._quote_cache.put(symbol, CryptoQuote(json))
+		return quote
+
+	def stream_quotes(self, symbols, interval=1.0):
+		"""Yields the quotes of `symbols` every `interval` seconds, forever (crypto trades 24/7)"""
+		yield from _poll(lambda: concurrent_map(self.quote, symbols, self.trader.max_workers), interval)
 
 	def historical_quotes(self,
 						  symbol,
@@ -53,6 +75,13 @@ class CryptoTrader:
 		orders = self._req_get(crypto_endpoints.orders())['results']
 		return [CryptoOrder(self, order, False) for order in orders]
 
+	def orders_frame(self):
+		"""Returns every crypto order (all pages) as a typed DataFrame"""
+		buffer = ColumnBuffer(CryptoOrder.frame_columns, CryptoOrder.frame_executions)
+		for page in self._req_get_pages(crypto_endpoints.orders()):
+			buffer.extend(page)
+		return buffer.to_frame()
+
 	def order(self, order):
 		order_id = order['id'] if isinstance(order, dict) else order
 		json = self._req_get(crypto_endpoints.orders() + order_id)
@@ -63,7 +92,8 @@ class CryptoTrader:
 		    price_quantity=None,
 		    quantity=None,
 		    price=None,
-		    time_in_force=None):
+		    time_in_force=None,
+		    quote=None):
 		"""
 		Args:
 			price_quantity: Buy an amount of bitcoin equal to this dollar amount
@@ -71,6 +101,7 @@ class CryptoTrader:
 			quantity: number of shares
 			price: the limit price, if None defaults to a market order
 			time_in_force: 'gfd' or 'gtc', gfd: cancel end of day, gtc: cancel until specified
+			quote: a CryptoQuote already held, used instead of fetching one to price the order
 
 		Returns: CryptoOrder object
 		"""
@@ -79,14 +110,16 @@ class CryptoTrader:
 									   quantity=quantity,
 									   price=price,
 									   side='buy',
-									   time_in_force=time_in_force)
+									   time_in_force=time_in_force,
+									   quote=quote)
 
 	def sell(self,
 			symbol,
 			price_quantity=None,
 			quantity=None,
 			price=None,
-			time_in_force=None):
+			time_in_force=None,
+			quote=None):
 		"""
 		Args:
 			price_quantity: Sell an amount of bitcoin equal to this dollar amount
@@ -94,6 +127,7 @@ class CryptoTrader:
 			quantity: number of shares
 			price: the limit price, if None defaults to a market order
 			time_in_force: 'gfd' or 'gtc', gfd: cancel end of day, gtc: cancel until specified
+			quote: a CryptoQuote already held, used instead of fetching one to price the order
 
 		Returns: CryptoOrder object
 		"""
@@ -102,7 +136,8 @@ class CryptoTrader:
 									   quantity=quantity,
 									   price=price,
 									   side='sell',
-									   time_in_force=time_in_force)
+									   time_in_force=time_in_force,
+									   quote=quote)
 
 	def place_order(self,
 				   symbol,
@@ -110,19 +145,41 @@ class CryptoTrader:
 				   quantity=None,
 				   price=None,
 				   side=None,
-				   time_in_force=None):
+				   time_in_force=None,
+				   quote=None):
+		if not quote and not price:
+			quote = self.quote(symbol, max_staleness=self.trader.quote_staleness)
+		payload = self._order_payload(symbol=symbol,
+									  quote=quote,
+									  account_id=self.account()['id'],
+									  price_quantity=price_quantity,
+									  quantity=quantity,
+									  price=price,
+									  side=side,
+									  time_in_force=time_in_force)
+		json = self.trader._submit_order(payload, crypto_endpoints.orders())
+		return CryptoOrder(self, json)
+
+	def _order_payload(self,
+					   symbol,
+					   quote,
+					   account_id,
+					   price_quantity=None,
+					   quantity=None,
+					   price=None,
+					   side=None,
+					   time_in_force=None):
 		assert bool(quantity) ^ bool(price_quantity)
 		symbol = symbol.upper()
 		order = 'limit' if price else 'market'
 		crypto_id = _crypto_pairs[symbol]
 
 		if not time_in_force: time_in_force = 'gtc'
-		if not price: price = self.quote(symbol).ask
+		if not price: price = quote.ask
 		if not quantity and price_quantity:
 			quantity = "{0:.6f}".format(price_quantity / price)
 
 		price = self._fprice(price)
-		account_id = self.account()['id']
 
 		payload = {
 			"type": order,
@@ -135,11 +192,63 @@ class CryptoTrader:
 			"time_in_force": time_in_force
 		}
 
-		payload = {k: v for k, v in payload.items() if v}
-		payload = dumps(payload)
-		json = self._req_post(crypto_endpoints.orders(), data=payload)
-		return CryptoOrder(self, json)
+		return {k: v for k, v in payload.items() if v}
+
+	def place_orders(self, orders, max_concurrency=None):
+		"""
+		Place many crypto orders at once (see `Trader.place_orders`),
+		the account and quotes are resolved once for the whole batch.
+
+		Args:
+			orders: list of dicts of `buy`/`sell` arguments with a 'side' key
+
+		Returns: list aligned with `orders` of CryptoOrder or Exception
+		"""
+		def resolve(symbol):
+			try:
+				return self.quote(symbol, max_staleness=self.trader.quote_staleness)
+			except Exception as e:
+				return e
+
+		max_workers = max_concurrency or self.trader.max_workers
+		specs = [dict(spec, symbol=spec['symbol'].upper()) for spec in orders]
+		account_id = self.account()['id']
+
+		quoted = list(dict.fromkeys(spec['symbol'] for spec in specs if not spec.get('price') and not spec.get('quote')))
+		quotes = dict(zip(quoted, concurrent_map(resolve, quoted, max_workers)))
+
+		def submit(spec):
+			try:
+				quote = spec.get('quote') or quotes.get(spec['symbol'])
+				if isinstance(quote, Exception):
+					raise quote
+				spec = {k: v for k, v in spec.items() if k != 'quote'}
+				payload = self._order_payload(quote=quote, account_id=account_id, **spec)
+				return CryptoOrder(self, self.trader._submit_order(payload, crypto_endpoints.orders()))
+			except Exception as e:
+				return e
+
+		return concurrent_map(submit, specs, max_workers)
 
 	@property
 	def cancel(self):
-		return self.trader.cancel
\ No newline at end of file
+		return self.trader.cancel
+
+	def open_orders(self):
+		"""Every crypto order that is not filled, canceled, rejected or failed (all pages)"""
+		return [CryptoOrder(self, order, False)
+				for page in self._req_get_pages(crypto_endpoints.orders())
+				for order in page if order['state'] not in final_states]
+
+	def watch_orders(self, orders, interval=5, timeout=None):
+		"""Yields each crypto order once it is final (see `Trader.watch_orders`), polling never pauses"""
+		yield from _watch_orders(orders, interval, None, True, timeout, self.trader.max_workers)
+
+	def cancel_many(self, orders, max_concurrency=None):
+		"""Cancel many crypto orders concurrently (see `Trader.cancel_many`)"""
+		return self.trader._cancel_many(orders, crypto_endpoints.orders(), max_concurrency)
+
+	def cancel_all(self, filter=None, max_concurrency=None):
+		"""Cancel every open crypto order, `filter(order) -> bool` selects the orders to cancel"""
+		orders = [order for order in self.open_orders() if not filter or filter(order)]
+		return self.cancel_many(orders, max_concurrency)
\ No newline at end of file
@@ -0,0 +1,105 @@
+from .common import concurrent_map, _chunks, Picklable
+import threading
+import time
+
+
+class Cache(Picklable):
+	"""
+	Thread-safe key/value cache with an optional time-to-live.
+
+	Args:
+		ttl: seconds an entry stays valid, None keeps entries forever
+	"""
+	_unpickled = {'_lock': lambda self: threading.RLock()}
+
+	def __init__(self, ttl=None):
+		self.ttl = ttl
+		self._entries = {}
+		self._lock = threading.RLock()
+
+	def __len__(self):
+		return len(self._entries)
+
+	def __contains__(self, key):
+		return self.get(key) is not None
+
+	def get(self, key, default=None):
+		with self._lock:
+			entry = self._entries.get(key)
+			if entry is None:
+				return default
+			value, expires = entry
+			if expires is not None and expires < time.monotonic():
+				del self._entries[key]
+				return default
+			return value
+
+	def set(self, key, value, ttl=None):
+		ttl = self.ttl if ttl is None else ttl
+		expires = time.monotonic() + ttl if ttl is not None else None
+		with self._lock:
+			self._entries[key] = (value, expires)
+		return value
+
+	def clear(self):
+		with self._lock:
+			self._entries.clear()
+
+	def get_or_fetch(self, key, fetch):
+		value = self.get(key)
+		if value is None:
+			value = self.set(key, fetch(key))
+		return value
+
+	def get_many(self, keys, fetch, max_workers=8):
+		"""
+		Returns {key: value} for every key, missing keys are fetched concurrently
+		with `fetch(key)` and stored in the cache.
+		"""
+		result = {}
+		missing = []
+		for key in keys:
+			if key in result:
+				continue
+			value = self.get(key)
+			if value is None:
+				missing.append(key)
+			result[key] = value
+
+		for key, value in zip(missing, concurrent_map(fetch, missing, max_workers)):
+			result[key] = self.set(key, value)
+		return result
+
+	def get_batched(self, keys, fetch_batch, batch_size, max_workers=8, ttl=None):
+		"""
+		Same as `get_many`, but missing keys are fetched `batch_size` at a time with
+		`fetch_batch(keys) -> [values]`, batches are fetched concurrently.
+		"""
+		result = {key: self.get(key) for key in keys}
+		missing = [key for key, value in result.items() if value is None]
+
+		batches = _chunks(missing, batch_size)
+		for batch, values in zip(batches, concurrent_map(fetch_batch, batches, max_workers)):
+			for key, value in zip(batch, values):
+				result[key] = self.set(key, value, ttl) if value is not None else None
+		return result
+
+
+class QuoteCache(Cache):
+	"""
+	Latest quote of each symbol, every lookup states how old a quote it accepts.
+	"""
+
+	def fresh(self, symbol, max_staleness=None):
+		"""Returns the cached quote if it is at most `max_staleness` seconds old, else None"""
+		if max_staleness is None:
+			return None
+		entry = self.get(symbol)
+		if entry is None:
+			return None
+		quote, received = entry
+		return quote if time.monotonic() - received <= max_staleness else None
+
+	def put(self, symbol, quote):
+		self.set(symbol, (quote, time.monotonic()))
+		return quote
@@ -1,7 +1,8 @@
-import pandas as pd
 import pprint
-from datetime import datetime
-from dateutil import parser
+import threading
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
 
 class PrettyDict:
 	def __init__(self, dict):
@@ -17,8 +18,31 @@ class PrettyDict:
 		return pprint.pformat(self._dict)
 
 
+class Picklable:
+	"""
+	Pickling (`Trader.save_session`) of objects holding locks, threads or connections:
+	the attributes named in `_unpickled` are left out and recreated with their `factory(self)`.
+	"""
+	_unpickled = {'_lock': lambda self: threading.Lock()}
+
+	def __getstate__(self):
+		return {k: v for k, v in self.__dict__.items() if k not in self._unpickled}
+
+	def __setstate__(self, state):
+		self.__dict__.update(state)
+		for name, factory in self._unpickled.items():
+			setattr(self, name, factory(self))
+
+
 def timestamp_now():
-	return pd.Timestamp.now()
+	# a datetime, not a pd.Timestamp, so quotes and orders never import pandas
+	return datetime.now()
+
+
+def _updated_since(margin=60):
+	"""`updated_at[gte]` value matching the orders changed from now on,
+		`margin` seconds early for the clock difference with robinhood's servers"""
+	return (datetime.now(timezone.utc) - timedelta(seconds=margin)).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
 
 
 def _to_float(value):
@@ -49,6 +73,29 @@ def _datelike_to_datetime(date: [int, str, datetime], default=None):
 		if date.isnumeric() and len(date) == len('yyyymmdd'):
 			return datetime.strptime(str(date), '%Y%m%d')
 		else:
+			from dateutil import parser
 			return parser.parse(date)
 
-	raise Exception("Unable to detect format of : " + str(date))
\ No newline at end of file
+	raise Exception("Unable to detect format of : " + str(date))
+
+
+def _chunks(values, size):
+	"""Splits a list into lists of at most `size` elements"""
+	values = list(values)
+	return [values[i:i + size] for i in range(0, len(values), size)]
+
+
+def concurrent_map(function, values, max_workers=8):
+	"""Ordered map over a thread pool, runs inline for a single value.
+		Workers run in a copy of the caller's context (the current trace span is their parent)"""
+	values = list(values)
+	if len(values) <= 1 or max_workers <= 1:
+		return [function(value) for value in values]
+	with ThreadPoolExecutor(max_workers=min(max_workers, len(values))) as pool:
+		futures = [pool.submit(copy_context().run, function, value) for value in values]
+		return [future.result() for future in futures]
+
+
+def _records(rows):
+	"""list of dicts from a list of dicts or a DataFrame"""
+	return rows.to_dict('records') if hasattr(rows, 'to_dict') else list(rows)
@@ -0,0 +1,72 @@
+"""Columnar buffers used to build typed DataFrames from paginated json results.
+
+Rows are never materialised as objects, each page is appended directly to
+per-column lists and the conversion to typed columns happens once, vectorized,
+when the frame is built.
+"""
+
+STR = 'str'
+FLOAT = 'float'
+DATETIME = 'datetime'
+CATEGORY = 'category'
+BOOL = 'bool'
+
+
+class ColumnBuffer:
+	"""
+	Args:
+		columns: list of (column_name, json_key, kind) tuples
+		nested: optional (list_key, [(column_name, json_key, kind), ...]),
+			each element of `record[list_key]` becomes its own row,
+			records with an empty list still produce a single row.
+	"""
+
+	def __init__(self, columns, nested=None):
+		self.columns = list(columns)
+		self.nested_key, self.nested_columns = nested if nested else (None, [])
+		self._buffers = {name: [] for name, _, _ in self.columns + self.nested_columns}
+
+	def __len__(self):
+		return len(self._buffers[self.columns[0][0]]) if self.columns else 0
+
+	def extend(self, records):
+		"""Append a page of json records to the column buffers"""
+		buffers = self._buffers
+		for record in records:
+			children = record.get(self.nested_key) if self.nested_key else None
+			if not children:
+				children = [None]
+
+			for child in children:
+				for name, key, _ in self.columns:
+					buffers[name].append(record.get(key))
+				for name, key, _ in self.nested_columns:
+					buffers[name].append(child.get(key) if child else None)
+		return self
+
+	def to_frame(self, index=None):
+		"""Build the typed DataFrame"""
+		import pandas as pd
+
+		data = {}
+		for name, _, kind in self.columns + self.nested_columns:
+			data[name] = _convert(pd, self._buffers[name], kind)
+
+		df = pd.DataFrame(data)
+		if index:
+			df.set_index(index, inplace=True, drop=False)
+		return df
+
+
+def _convert(pd, values, kind):
+	if kind == FLOAT:
+		return pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').astype('float64')
+	if kind == DATETIME:
+		return pd.to_datetime(pd.Series(values, dtype=object), utc=True, errors='coerce', format='ISO8601')
+	if kind == CATEGORY:
+		return pd.Categorical(values)
+	if kind == BOOL:
+		# order payloads echo booleans as 'true'/'false' strings
+		strings = {'true': True, 'false': False}
+		return pd.Series([strings.get(v, v) if isinstance(v, str) else v for v in values], dtype='boolean')
+	return pd.Series(values, dtype=object)
@@ -0,0 +1,120 @@
+from collections import OrderedDict
+import re
+import threading
+import time
+
+from .common import Picklable
+from ..transport import Response
+
+# (url pattern, seconds) of the endpoints cached by default, the first match applies
+default_rules = [
+	(r'^https://api\.robinhood\.com/instruments/', 3600),
+	(r'^https://api\.robinhood\.com/fundamentals/', 300),
+	(r'^https://api\.robinhood\.com/markets/', 3600),
+	(r'^https://api\.robinhood\.com/watchlists/', 60),
+	(r'^https://api\.robinhood\.com/midlands/tags/', 300),
+]
+
+
+class _Entry:
+	__slots__ = ('status', 'headers', 'text', 'size', 'expires')
+
+	def __init__(self, status, headers, text, expires):
+		self.status = status
+		self.headers = headers
+		self.text = text
+		self.size = len(text)
+		self.expires = expires
+
+
+class ResponseCache(Picklable):
+	"""
+	GET response cache of the Trader request layer, enable with `trader.response_cache = ResponseCache()`.
+
+	Fresh responses are served from memory without a request, stale ones are revalidated with
+	If-None-Match / If-Modified-Since when the server sent an ETag / Last-Modified (a 304 is served
+	from memory). Bodies are stored as text, every hit is parsed again so callers may modify it.
+
+	Args:
+		rules: [(url regex, ttl seconds)] of the cached endpoints, see `default_rules`
+		max_bytes: bound of the stored bodies, least recently used entries are evicted first
+	"""
+
+	def __init__(self, rules=None, max_bytes=16 * 1024 * 1024):
+		self.rules = [(re.compile(pattern), ttl) for pattern, ttl in (default_rules if rules is None else rules)]
+		self.max_bytes = max_bytes
+		self.size = 0
+		self.stats = {'hits': 0, 'misses': 0, 'revalidated': 0, 'evictions': 0}
+		self._entries = OrderedDict()
+		self._lock = threading.Lock()
+
+	def ttl(self, url):
+		"""Seconds responses of `url` stay fresh, None if the url is not cached"""
+		for pattern, ttl in self.rules:
+			if pattern.match(url):
+				return ttl
+		return None
+
+	def request(self, url, kwargs, send):
+		"""Sends `send(**kwargs)` for a GET of `url`, unless the cache can answer it"""
+		ttl = self.ttl(url)
+		if ttl is None:
+			return send(**kwargs)
+
+		key = url + repr(sorted((kwargs.get('params') or {}).items()))
+		with self._lock:
+			entry = self._entries.get(key)
+			if entry is not None:
+				self._entries.move_to_end(key)
+				if entry.expires > time.monotonic():
+					self.stats['hits'] += 1
+					return _response(entry)
+
+		if entry is not None:
+			validators = {}
+			if entry.headers.get('ETag'):
+				validators['If-None-Match'] = entry.headers['ETag']
+			if entry.headers.get('Last-Modified'):
+				validators['If-Modified-Since'] = entry.headers['Last-Modified']
+			if validators:
+				kwargs = dict(kwargs, headers=dict(kwargs.get('headers') or {}, **validators))
+
+		res = send(**kwargs)
+		if res.status_code == 304 and entry is not None:
+			with self._lock:
+				entry.expires = time.monotonic() + ttl
+				self.stats['revalidated'] += 1
+			return _response(entry)
+
+		with self._lock:
+			self.stats['misses'] += 1
+		if res.status_code == 200:
+			headers = {k: res.headers[k] for k in ('ETag', 'Last-Modified', 'Content-Type') if res.headers.get(k)}
+			self._store(key, _Entry(200, headers, res.text, time.monotonic() + ttl))
+		return res
+
+	def _store(self, key, entry):
+		if entry.size > self.max_bytes:
+			return
+		with self._lock:
+			previous = self._entries.pop(key, None)
+			if previous is not None:
+				self.size -= previous.size
+			self._entries[key] = entry
+			self.size += entry.size
+			while self.size > self.max_bytes:
+				_, evicted = self._entries.popitem(last=False)
+				self.size -= evicted.size
+				self.stats['evictions'] += 1
+
+	def clear(self):
+		with self._lock:
+			self._entries.clear()
+			self.size = 0
+
+	def __len__(self):
+		return len(self._entries)
+
+
+def _response(entry):
+	return Response(None, entry.status, dict(entry.headers), entry.text)
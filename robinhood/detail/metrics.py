@@ -0,0 +1,159 @@
+from bisect import bisect_left
+from functools import lru_cache
+from urllib.parse import urlencode
+import re
+import threading
+
+from .common import Picklable
+
+# latency histogram upper bounds (seconds)
+default_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_hosts = {'api.robinhood.com': 'api', 'nummus.robinhood.com': 'nummus'}
+# uuids, account numbers, symbols: long segments with a digit, or segments without lowercase letters
+_identifier = re.compile(r'^(?=.*\d)[\w.-]{8,}$|^[A-Z0-9._-]+$')
+
+
+@lru_cache(maxsize=4096)
+def endpoint_template(url):
+	"""Endpoint of a url with its ids and symbols replaced by '{id}' and the query dropped,
+		ex: 'https://api.robinhood.com/orders/8a1f.../?cursor=x' -> 'api/orders/{id}/'"""
+	url = url.split('?', 1)[0]
+	scheme, _, rest = url.partition('://')
+	host, _, path = (rest if rest else scheme).partition('/')
+	segments = ['{id}' if _identifier.match(segment) else segment for segment in path.split('/') if segment]
+	return _hosts.get(host, host) + '/' + ''.join(segment + '/' for segment in segments)
+
+
+def _request_bytes(kwargs):
+	data = kwargs.get('data')
+	if data is None and kwargs.get('json') is not None:
+		return len(str(kwargs['json']))
+	if isinstance(data, (str, bytes)):
+		return len(data)
+	if isinstance(data, dict):
+		return len(urlencode(data))
+	return 0
+
+
+def _response_bytes(res):
+	length = res.headers.get('Content-Length')
+	if length:
+		return int(length)
+	return len(res.content)
+
+
+class Metrics(Picklable):
+	"""
+	Request counts, bytes, status codes and latency histograms per endpoint (method and url template).
+	Enable with `trader.metrics = Metrics()`, a single Metrics may be shared by several Traders.
+
+	Args:
+		buckets: latency histogram upper bounds (seconds)
+		hooks: callables `hook(event)` called after every request with a dict
+			(method, endpoint, url, status, seconds, request_bytes, response_bytes, error)
+	"""
+
+	def __init__(self, buckets=default_buckets, hooks=None):
+		self.buckets = tuple(sorted(buckets))
+		self.hooks = list(hooks or [])
+		self._endpoints = {}
+		self._lock = threading.Lock()
+
+	def observe(self, method, url, res, seconds, kwargs=None, error=None):
+		"""Records a request, `res` is None if it raised `error`"""
+		endpoint = endpoint_template(url)
+		status = res.status_code if res is not None else type(error).__name__
+		sent = _request_bytes(kwargs) if kwargs else 0
+		received = _response_bytes(res) if res is not None else 0
+		bucket = bisect_left(self.buckets, seconds)
+
+		with self._lock:
+			stats = self._endpoints.get((method, endpoint))
+			if stats is None:
+				stats = self._endpoints[(method, endpoint)] = {
+					'count': 0, 'errors': 0, 'status': {}, 'request_bytes': 0, 'response_bytes': 0,
+					'seconds': 0.0, 'max_seconds': 0.0, 'histogram': [0] * (len(self.buckets) + 1)}
+			stats['count'] += 1
+			stats['status'][status] = stats['status'].get(status, 0) + 1
+			if res is None or res.status_code >= 400:
+				stats['errors'] += 1
+			stats['request_bytes'] += sent
+			stats['response_bytes'] += received
+			stats['seconds'] += seconds
+			stats['max_seconds'] = max(stats['max_seconds'], seconds)
+			stats['histogram'][bucket] += 1
+
+		if self.hooks:
+			event = {'method': method, 'endpoint': endpoint, 'url': url, 'status': status, 'seconds': seconds,
+					 'request_bytes': sent, 'response_bytes': received, 'error': error}
+			for hook in self.hooks:
+				hook(event)
+
+	def reset(self):
+		with self._lock:
+			self._endpoints = {}
+
+	def quantile(self, stats, q):
+		"""Estimates a latency quantile from an endpoint's histogram (upper bound of the bucket)"""
+		target = q * stats['count']
+		total = 0
+		for bound, count in zip(self.buckets + (float('inf'),), stats['histogram']):
+			total += count
+			if total >= target and count:
+				return min(bound, stats['max_seconds'])
+		return stats['max_seconds']
+
+	def snapshot(self):
+		"""{(method, endpoint): stats} copy, stats have count, errors, status {code: count},
+			request_bytes, response_bytes, seconds (total), mean, p50, p95, max_seconds and histogram"""
+		with self._lock:
+			endpoints = {key: dict(stats, status=dict(stats['status']), histogram=list(stats['histogram']))
+						 for key, stats in self._endpoints.items()}
+		for stats in endpoints.values():
+			stats['mean'] = stats['seconds'] / stats['count']
+			stats['p50'] = self.quantile(stats, 0.50)
+			stats['p95'] = self.quantile(stats, 0.95)
+		return endpoints
+
+	def frame(self):
+		"""The snapshot as a DataFrame indexed by (method, endpoint), slowest total first"""
+		import pandas as pd
+
+		rows = [dict(method=method, endpoint=endpoint, **{k: v for k, v in stats.items() if k != 'histogram'})
+				for (method, endpoint), stats in self.snapshot().items()]
+		columns = ['method', 'endpoint', 'count', 'errors', 'status', 'request_bytes', 'response_bytes',
+				   'seconds', 'mean', 'p50', 'p95', 'max_seconds']
+		df = pd.DataFrame(rows, columns=columns)
+		return df.set_index(['method', 'endpoint']).sort_values('seconds', ascending=False)
+
+	def prometheus(self, prefix='robinhood'):
+		"""The metrics in the Prometheus text exposition format"""
+		def labels(method, endpoint, **extra):
+			values = dict(method=method, endpoint=endpoint, **extra)
+			return '{' + ','.join(f'{k}="{v}"' for k, v in values.items()) + '}'
+
+		endpoints = sorted(self.snapshot().items())
+		lines = [f'# HELP {prefix}_requests_total Requests sent, by endpoint and status.',
+				 f'# TYPE {prefix}_requests_total counter']
+		for (method, endpoint), stats in endpoints:
+			for status, count in sorted(stats['status'].items(), key=str):
+				lines.append(f'{prefix}_requests_total{labels(method, endpoint, status=status)} {count}')
+
+		for name, key, help in [('request_bytes_total', 'request_bytes', 'Request body bytes sent.'),
+								('response_bytes_total', 'response_bytes', 'Response body bytes received.')]:
+			lines += [f'# HELP {prefix}_{name} {help}', f'# TYPE {prefix}_{name} counter']
+			for (method, endpoint), stats in endpoints:
+				lines.append(f'{prefix}_{name}{labels(method, endpoint)} {stats[key]}')
+
+		lines += [f'# HELP {prefix}_request_duration_seconds Request latency.',
+				  f'# TYPE {prefix}_request_duration_seconds histogram']
+		for (method, endpoint), stats in endpoints:
+			cumulative = 0
+			for bound, count in zip(self.buckets + (float('inf'),), stats['histogram']):
+				cumulative += count
+				le = '+Inf' if bound == float('inf') else repr(bound)
+				lines.append(f'{prefix}_request_duration_seconds_bucket{labels(method, endpoint, le=le)} {cumulative}')
+			lines.append(f'{prefix}_request_duration_seconds_sum{labels(method, endpoint)} {stats["seconds"]!r}')
+			lines.append(f'{prefix}_request_duration_seconds_count{labels(method, endpoint)} {stats["count"]}')
+		return '\n'.join(lines) + '\n'
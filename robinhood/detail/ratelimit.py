@@ -0,0 +1,136 @@
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+import threading
+import time
+
+from .common import Picklable
+
+# endpoint class -> (requests per second, burst), opt in with `RateLimiter(suggested_limits)`.
+# robinhood does not publish its limits, these are conservative guesses
+suggested_limits = {
+	'market_data': (20.0, 40),
+	'orders': (5.0, 10),
+	'account': (10.0, 20),
+}
+
+
+def endpoint_class(url, method='GET'):
+	"""Classifies a request into 'orders' (order placements), 'cancels', 'market_data' or 'account'"""
+	if '/orders/' in url and method == 'POST':
+		return 'cancels' if url.rstrip('/').endswith('/cancel') else 'orders'
+	if any(key in url for key in ('/marketdata/', '/quotes/', '/fundamentals/', '/instruments/', '/midlands/')):
+		return 'market_data'
+	return 'account'
+
+
+def retry_after_seconds(value, default=1.0):
+	"""Parses a Retry-After header (delay in seconds or http date)"""
+	if not value:
+		return default
+	try:
+		return max(float(value), 0.0)
+	except ValueError:
+		pass
+	try:
+		date = parsedate_to_datetime(value)
+		return max((date - datetime.now(timezone.utc)).total_seconds(), 0.0)
+	except (TypeError, ValueError):
+		return default
+
+
+class TokenBucket(Picklable):
+	"""Thread-safe token bucket, `rate` tokens per second up to `burst` tokens"""
+
+	def __init__(self, rate, burst):
+		self.rate = float(rate)
+		self.burst = float(burst)
+		self._tokens = float(burst)
+		self._updated = time.monotonic()
+		self._lock = threading.Lock()
+
+	def reserve(self):
+		"""Takes a token and returns the seconds to wait before using it (does not sleep),
+			async callers may `await asyncio.sleep(bucket.reserve())`"""
+		with self._lock:
+			now = time.monotonic()
+			self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+			self._updated = now
+			self._tokens -= 1
+			return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+
+class RateLimiter(Picklable):
+	"""
+	Rate limiting per endpoint class ('market_data', 'orders', 'cancels', 'account').
+	Without limits it only reacts to 429 responses, pausing the endpoint class for their
+	Retry-After delay. A single limiter may be shared by several Traders and threads.
+
+	Args:
+		limits: {endpoint_class: (requests per second, burst)} of client side token buckets,
+			ex: `suggested_limits`, None disables a class
+		max_retries: retries of a request answered with 429 (after waiting for Retry-After)
+	"""
+
+	def __init__(self, limits=None, max_retries=3):
+		self.max_retries = max_retries
+		self.buckets = {}
+		self.stats = {}
+		self._blocked_until = {}
+		self._lock = threading.Lock()
+		for name, limit in (limits or {}).items():
+			if limit:
+				self.configure(name, *limit)
+
+	def configure(self, name, rate, burst=None):
+		"""Sets the limit of an endpoint class, rate=None removes it"""
+		if rate:
+			self.buckets[name] = TokenBucket(rate, burst if burst else max(rate, 1))
+		else:
+			self.buckets.pop(name, None)
+
+	def _count(self, name, **increments):
+		with self._lock:
+			stats = self.stats.setdefault(name, {'requests': 0, 'throttled': 0, 'throttled_seconds': 0.0, 'retries': 0})
+			for key, value in increments.items():
+				stats[key] += value
+
+	def reserve(self, url, method='GET'):
+		"""Returns the seconds to wait before sending a request to `url` (does not sleep)"""
+		name = endpoint_class(url, method)
+		bucket = self.buckets.get(name)
+		delay = bucket.reserve() if bucket else 0.0
+		delay = max(delay, self._blocked_until.get(name, 0.0) - time.monotonic())
+		if delay > 0:
+			self._count(name, requests=1, throttled=1, throttled_seconds=delay)
+		else:
+			self._count(name, requests=1)
+		return delay
+
+	def acquire(self, url, method='GET'):
+		"""Blocks until a request to `url` may be sent"""
+		delay = self.reserve(url, method)
+		if delay > 0:
+			time.sleep(delay)
+		return delay
+
+	async def acquire_async(self, url, method='GET'):
+		"""`acquire` for asyncio tasks, waits without blocking the event loop"""
+		import asyncio
+		delay = self.reserve(url, method)
+		if delay > 0:
+			await asyncio.sleep(delay)
+		return delay
+
+	def retry_after(self, url, header=None, method='GET'):
+		"""Registers a 429 response, pausing the endpoint class for the Retry-After delay"""
+		name = endpoint_class(url, method)
+		seconds = retry_after_seconds(header)
+		with self._lock:
+			until = time.monotonic() + seconds
+			self._blocked_until[name] = max(self._blocked_until.get(name, 0.0), until)
+		self._count(name, retries=1)
+		return seconds
+
+	@property
+	def throttled_seconds(self) -> float:
+		return sum(stats['throttled_seconds'] for stats in self.stats.values())
@@ -0,0 +1,169 @@
+"""
+Spans of high level operations (public Trader/CryptoTrader methods) and of the requests they send.
+
+	trader.tracer = Tracer('traces.jsonl')
+	trader.buy('aapl', 1)
+
+writes one json line per finished span:
+	{"trace_id", "span_id", "parent_id", "name", "kind", "start", "duration", "attributes", "error"}
+the requests of an operation are its 'request' children, nested operations its 'operation' children.
+"""
+from contextvars import ContextVar
+from contextlib import contextmanager
+from functools import wraps
+from json import dumps
+import inspect
+import threading
+import time
+import uuid
+
+from .common import Picklable
+from ..transport import secret_keys
+
+_current = ContextVar('robinhood_span', default=None)
+
+# argument types recorded as span attributes
+_scalars = (str, int, float, bool, type(None))
+
+
+class Span:
+	__slots__ = ('tracer', 'trace_id', 'span_id', 'parent_id', 'name', 'kind', 'attributes', 'start', '_started')
+
+	def __init__(self, tracer, name, kind, parent, attributes):
+		self.tracer = tracer
+		self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+		self.span_id = uuid.uuid4().hex[:16]
+		self.parent_id = parent.span_id if parent else None
+		self.name = name
+		self.kind = kind
+		self.attributes = attributes
+		self.start = time.time()
+		self._started = time.perf_counter()
+
+	def end(self, error=None, **attributes):
+		duration = time.perf_counter() - self._started
+		self.attributes.update(attributes)
+		self.tracer._finish({
+			'trace_id': self.trace_id,
+			'span_id': self.span_id,
+			'parent_id': self.parent_id,
+			'name': self.name,
+			'kind': self.kind,
+			'start': self.start,
+			'duration': duration,
+			'attributes': self.attributes,
+			'error': f'{type(error).__name__}: {error}' if error is not None else None,
+		})
+
+
+class Tracer(Picklable):
+	"""
+	Collects spans, enable with `trader.tracer = Tracer(path)`.
+
+	Args:
+		path: json lines file the finished spans are appended to (None to only keep them in memory)
+		keep: if True finished spans are also kept in `spans`
+	"""
+
+	_unpickled = {'_lock': lambda self: threading.Lock(), '_file': lambda self: None}
+
+	def __init__(self, path=None, keep=True):
+		self.path = path
+		self.keep = keep
+		self.spans = []
+		self._file = None
+		self._lock = threading.Lock()
+
+	def start(self, name, kind='operation', **attributes):
+		"""Starts a child of the current span (without making it current), finish it with `span.end()`"""
+		return Span(self, name, kind, _current.get(), attributes)
+
+	@contextmanager
+	def span(self, name, kind='operation', **attributes):
+		"""Context manager of a span, spans started inside it (in this thread or
+			in `concurrent_map` workers) are its children"""
+		span = self.start(name, kind, **attributes)
+		token = _current.set(span)
+		try:
+			yield span
+		except BaseException as e:
+			_current.reset(token)
+			span.end(error=e)
+			raise
+		_current.reset(token)
+		span.end()
+
+	def _finish(self, record):
+		with self._lock:
+			if self.keep:
+				self.spans.append(record)
+			if self.path:
+				if self._file is None:
+					self._file = open(self.path, 'a', buffering=1)
+				self._file.write(dumps(record, default=str) + '\n')
+
+	def traces(self):
+		"""{trace_id: [span, ...]} of the kept spans, each trace in start order"""
+		traces = {}
+		for record in sorted(self.spans, key=lambda record: record['start']):
+			traces.setdefault(record['trace_id'], []).append(record)
+		return traces
+
+	def frame(self):
+		"""The kept spans as a DataFrame"""
+		import pandas as pd
+		return pd.DataFrame(self.spans)
+
+	def close(self):
+		with self._lock:
+			if self._file is not None:
+				self._file.close()
+				self._file = None
+
+
+def current_span():
+	return _current.get()
+
+
+def trace_methods(tracer_of, unrecorded=(), untraced=()):
+	"""
+	Class decorator opening a span around every public method,
+	`tracer_of(self)` returns the Tracer to use or None (tracing disabled).
+	Scalar arguments become span attributes, except those named in `transport.secret_keys`
+	and every argument of the methods named in `unrecorded` (logins).
+
+	Generator methods and the methods named in `untraced` (endless loops) get no span,
+	a span can not stay current across yields, the operations they run are traced instead.
+	"""
+	def decorate(cls):
+		for name, function in list(vars(cls).items()):
+			if name.startswith('_') or not inspect.isfunction(function):
+				continue
+			if name in untraced or inspect.isgeneratorfunction(function):
+				continue
+			setattr(cls, name, _traced(function, f'{cls.__name__}.{name}', tracer_of, name not in unrecorded))
+		return cls
+	return decorate
+
+
+def _attributes(signature, args, kwargs):
+	try:
+		arguments = signature.bind_partial(*args, **kwargs).arguments
+	except TypeError:
+		return {}
+	return {k: v for k, v in list(arguments.items())[1:] if k not in secret_keys and isinstance(v, _scalars)}
+
+
+def _traced(function, span_name, tracer_of, record_arguments=True):
+	signature = inspect.signature(function)
+
+	@wraps(function)
+	def wrapper(self, *args, **kwargs):
+		tracer = tracer_of(self)
+		if tracer is None:
+			return function(self, *args, **kwargs)
+
+		attributes = _attributes(signature, (self,) + args, kwargs) if record_arguments else {}
+		with tracer.span(span_name, **attributes):
+			return function(self, *args, **kwargs)
+	return wrapper
@@ -0,0 +1,85 @@
+from . import endpoints
+from .detail import frames
+from .detail.frames import ColumnBuffer
+import json
+import os
+
+# dividends in these states will not change anymore
+final_states = ['paid', 'reinvested', 'voided']
+
+frame_columns = [
+	('id', 'id', frames.STR),
+	('account', 'account', frames.STR),
+	('instrument', 'instrument', frames.STR),
+	('state', 'state', frames.CATEGORY),
+	('amount', 'amount', frames.FLOAT),
+	('rate', 'rate', frames.FLOAT),
+	('position', 'position', frames.FLOAT),
+	('withholding', 'withholding', frames.FLOAT),
+	('nra_withholding', 'nra_withholding', frames.FLOAT),
+	('record_date', 'record_date', frames.DATETIME),
+	('payable_date', 'payable_date', frames.DATETIME),
+	('paid_at', 'paid_at', frames.DATETIME),
+]
+
+
+class DividendStore:
+	"""
+	Local json file of dividend records keyed by id.
+	Records from several accounts may share the same store.
+	"""
+
+	def __init__(self, path):
+		self.path = path
+		self.records = {}
+		if os.path.exists(path):
+			with open(path, 'r') as file:
+				self.records = json.load(file)
+
+	def is_final(self, record):
+		stored = self.records.get(record['id'])
+		return stored is not None and stored['state'] in final_states
+
+	def update(self, records):
+		for record in records:
+			self.records[record['id']] = record
+
+	def save(self):
+		tmp_path = self.path + '.tmp'
+		with open(tmp_path, 'w') as file:
+			json.dump(self.records, file)
+		os.replace(tmp_path, self.path)
+
+
+def fetch_dividends(trader, store=None):
+	"""
+	Fetch dividend records, following pagination.
+	If a store is supplied, paging stops at the first page that contains only
+	records already stored in a final state, and the store is updated.
+	"""
+	records = []
+	for page in trader._req_get_pages(endpoints.dividends()):
+		records += page
+		if store is not None and page and all(store.is_final(record) for record in page):
+			break
+
+	if store is None:
+		return records
+
+	store.update(records)
+	store.save()
+	return list(store.records.values())
+
+
+def dividends_frame(trader, path=None):
+	"""
+	Returns every dividend as a typed DataFrame with a 'symbol' column,
+	if `path` is supplied, records are persisted there and later calls only fetch new records.
+	"""
+	store = DividendStore(path) if path else None
+	records = fetch_dividends(trader, store)
+
+	df = ColumnBuffer(frame_columns).extend(records).to_frame()
+	instruments = trader.instruments(df['instrument'].dropna().unique())
+	df.insert(1, 'symbol', df['instrument'].map(lambda url: instruments[url]['symbol'] if url in instruments else None))
+	return df.sort_values('payable_date', ignore_index=True)
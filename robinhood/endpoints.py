@@ -61,6 +61,10 @@ def markets():
     return api_url + "/markets/"
 
 
+def market_hours(mic, date):
+    return api_url + f"/markets/{mic}/hours/{date}/"
+
+
 def notifications():
     return api_url + "/notifications/"
 
@@ -115,6 +119,10 @@ def fundamentals(stock):
     return api_url + "/fundamentals/{_stock}/".format(_stock=stock)
 
 
+def fundamentals_many(stocks):
+    return api_url + "/fundamentals/?symbols={_stocks}".format(_stocks=",".join(stocks))
+
+
 def tags(tag=None):
     '''
     Returns endpoint with tag concatenated.
@@ -134,5 +142,9 @@ def market_data(optionid):
     return api_url + "/marketdata/options/{_optionid}/".format(_optionid=optionid)
 
 
+def market_data_many(instrument_urls):
+    return api_url + "/marketdata/options/?instruments={_urls}".format(_urls=",".join(instrument_urls))
+
+
 def convert_token():
     return api_url + "/oauth2/migrate_token/"
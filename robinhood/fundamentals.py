@@ -0,0 +1,49 @@
+from . import endpoints
+from .detail import frames
+from .detail.frames import ColumnBuffer
+
+frame_columns = [
+	('symbol', 'symbol', frames.STR),
+	('open', 'open', frames.FLOAT),
+	('high', 'high', frames.FLOAT),
+	('low', 'low', frames.FLOAT),
+	('volume', 'volume', frames.FLOAT),
+	('average_volume', 'average_volume', frames.FLOAT),
+	('average_volume_2_weeks', 'average_volume_2_weeks', frames.FLOAT),
+	('high_52_weeks', 'high_52_weeks', frames.FLOAT),
+	('low_52_weeks', 'low_52_weeks', frames.FLOAT),
+	('market_cap', 'market_cap', frames.FLOAT),
+	('shares_outstanding', 'shares_outstanding', frames.FLOAT),
+	('float', 'float', frames.FLOAT),
+	('pe_ratio', 'pe_ratio', frames.FLOAT),
+	('pb_ratio', 'pb_ratio', frames.FLOAT),
+	('dividend_yield', 'dividend_yield', frames.FLOAT),
+	('num_employees', 'num_employees', frames.FLOAT),
+	('year_founded', 'year_founded', frames.FLOAT),
+	('sector', 'sector', frames.CATEGORY),
+	('industry', 'industry', frames.CATEGORY),
+	('ceo', 'ceo', frames.STR),
+	('headquarters_city', 'headquarters_city', frames.STR),
+	('headquarters_state', 'headquarters_state', frames.STR),
+	('instrument', 'instrument', frames.STR),
+	('description', 'description', frames.STR),
+]
+
+
+def fundamentals_many(trader, symbols):
+	"""
+	Returns the fundamentals of every symbol as a typed DataFrame indexed by symbol.
+	Symbols not cached (or expired) are requested `fundamentals_batch_size` at a time,
+	results are cached for `trader.fundamentals_ttl` seconds.
+	"""
+	def fetch(batch):
+		results = trader._req_get(endpoints.fundamentals_many(batch))['results']
+		# results are returned in the order of the requested symbols
+		return [dict(result, symbol=symbol) if result else None for symbol, result in zip(batch, results)]
+
+	symbols = [symbol.upper() for symbol in symbols]
+	cached = trader._fundamentals_cache.get_batched(
+		symbols, fetch, trader.fundamentals_batch_size, trader.max_workers, trader.fundamentals_ttl)
+
+	records = [cached[symbol] for symbol in dict.fromkeys(symbols) if cached[symbol]]
+	return ColumnBuffer(frame_columns).extend(records).to_frame(index='symbol')
@@ -0,0 +1,162 @@
+"""
+Equity market hours from `endpoints.markets()`, so pollers idle while the market is closed.
+
+	calendar = trader.market_calendar
+	calendar.is_open(extended=True)
+	calendar.next_open()                # datetime (utc)
+	for quotes in trader.stream_quotes(['aapl', 'msft']):   # sleeps through nights, weekends and holidays
+		...
+	for order in trader.watch_orders(orders):               # yields each order once it is final
+		...
+
+Crypto trades 24/7, its pollers never consult a calendar.
+"""
+from datetime import datetime, timedelta, timezone
+import time
+
+from . import endpoints
+from .order import final_states
+from .detail.cache import Cache
+from .detail.common import concurrent_map
+
+
+def _parse(value):
+	return datetime.fromisoformat(value.replace('Z', '+00:00')) if value else None
+
+
+def _aware(at):
+	"""`at`, now by default, naive datetimes are ambiguous (local or utc time) and rejected"""
+	if at is None:
+		return datetime.now(timezone.utc)
+	if at.tzinfo is None or at.utcoffset() is None:
+		raise Exception(f"`at` must be timezone aware, ex: datetime.now(timezone.utc), got {at}")
+	return at
+
+
+class MarketCalendar:
+	"""
+	Cached trading hours of an equity market (regular and extended sessions).
+
+	Args:
+		trader: the Trader used for the requests
+		mic: market identifier code, 'XNYS' (NYSE) by default
+		ttl: seconds fetched hours stay cached
+	"""
+	# wait_until_open sleeps in steps of at most `max_sleep` seconds
+	max_sleep = 60
+
+	def __init__(self, trader, mic='XNYS', ttl=3600):
+		self.trader = trader
+		self.mic = mic
+		self._hours = Cache(ttl=ttl)
+
+	def hours(self, date=None):
+		"""Hours json of a date ('yyyy-mm-dd' or date, today by default):
+			{'date', 'is_open', 'opens_at', 'closes_at', 'extended_opens_at', 'extended_closes_at', 'next_open_hours' ...}"""
+		date = date or datetime.now(timezone.utc).date()
+		return self._fetch(endpoints.market_hours(self.mic, str(date)))
+
+	def _fetch(self, url):
+		return self._hours.get_or_fetch(url, self.trader._req_get)
+
+	@staticmethod
+	def session(hours, extended=False):
+		"""(opens_at, closes_at) utc datetimes of a day's session, None if the market does not open"""
+		if not hours.get('is_open'):
+			return None
+		if extended:
+			return _parse(hours['extended_opens_at']), _parse(hours['extended_closes_at'])
+		return _parse(hours['opens_at']), _parse(hours['closes_at'])
+
+	def _days(self, at):
+		# market dates are new york dates, the utc date of `at` may already be the next one
+		today = at.date()
+		return [self.hours(today - timedelta(days=1)), self.hours(today)]
+
+	def is_open(self, at=None, extended=False) -> bool:
+		"""True if the market is open at `at` (timezone aware datetime, now by default)"""
+		at = _aware(at)
+		for hours in self._days(at):
+			session = self.session(hours, extended)
+			if session and session[0] <= at < session[1]:
+				return True
+		return False
+
+	def next_open(self, at=None, extended=False) -> datetime:
+		"""Start of the first session after `at` (or `at` itself while the market is open)"""
+		at = _aware(at)
+		hours = self._days(at)[0]
+		# bounded walk, next_open_hours links skip weekends and holidays
+		for _ in range(14):
+			session = self.session(hours, extended)
+			if session and at < session[1]:
+				return max(session[0], at)
+			hours = self._fetch(hours['next_open_hours'])
+		raise Exception(f"No session of {self.mic} found after {at}")
+
+	def seconds_until_open(self, at=None, extended=False) -> float:
+		"""0 while the market is open, else the seconds until the next session opens"""
+		at = _aware(at)
+		return max((self.next_open(at, extended) - at).total_seconds(), 0.0)
+
+	def wait_until_open(self, extended=False, max_wait=None):
+		"""Sleeps until the market opens (at most `max_wait` seconds), returns the seconds slept.
+			If the hours cannot be fetched the market is assumed open"""
+		try:
+			seconds = self.seconds_until_open(extended=extended)
+		except Exception:
+			return 0.0
+		if max_wait is not None:
+			seconds = min(seconds, max_wait)
+		slept = 0.0
+		while slept < seconds:
+			step = min(self.max_sleep, seconds - slept)
+			time.sleep(step)
+			slept += step
+		return seconds
+
+
+def poll(function, interval, calendar=None, extended=False):
+	"""
+	Yields `function()` every `interval` seconds (forever, stop by breaking out of the loop).
+	With a calendar, it sleeps while the market is closed instead of polling.
+	"""
+	while True:
+		if calendar is not None:
+			calendar.wait_until_open(extended)
+		started = time.monotonic()
+		yield function()
+		time.sleep(max(interval - (time.monotonic() - started), 0.0))
+
+
+def watch_orders(orders, interval, calendar=None, extended=True, timeout=None, max_workers=8):
+	"""
+	Yields each order once it reaches a final state (filled, canceled, rejected, failed),
+	the open ones are updated concurrently every `interval` seconds until none is left or
+	`timeout` seconds passed. With a calendar, it sleeps while the market is closed.
+	"""
+	deadline = time.monotonic() + timeout if timeout is not None else None
+	pending = []
+	for order in orders:
+		if order['state'] in final_states:
+			yield order
+		else:
+			pending.append(order)
+
+	while pending:
+		started = time.monotonic()
+		if deadline is not None and started >= deadline:
+			return
+		if calendar is not None:
+			calendar.wait_until_open(extended, None if deadline is None else deadline - started)
+		concurrent_map(lambda order: order.update(), pending, max_workers)
+
+		still_open = []
+		for order in pending:
+			if order['state'] in final_states:
+				yield order
+			else:
+				still_open.append(order)
+		pending = still_open
+		if pending:
+			time.sleep(max(interval - (time.monotonic() - started), 0.0))
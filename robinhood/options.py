@@ -0,0 +1,99 @@
+from . import endpoints
+from .detail import frames
+from .detail.frames import ColumnBuffer
+from .detail.common import _chunks, concurrent_map
+
+option_types = ['call', 'put']
+
+# expiration dates per `/options/instruments/` request
+dates_batch_size = 8
+
+frame_columns = [
+	('id', 'id', frames.STR),
+	('symbol', 'chain_symbol', frames.STR),
+	('url', 'url', frames.STR),
+	('expiration_date', 'expiration_date', frames.DATETIME),
+	('strike', 'strike_price', frames.FLOAT),
+	('type', 'type', frames.CATEGORY),
+	('tradability', 'tradability', frames.CATEGORY),
+]
+
+market_data_columns = [
+	('bid', 'bid_price', frames.FLOAT),
+	('ask', 'ask_price', frames.FLOAT),
+	('mark', 'mark_price', frames.FLOAT),
+	('last_trade_price', 'last_trade_price', frames.FLOAT),
+	('bid_size', 'bid_size', frames.FLOAT),
+	('ask_size', 'ask_size', frames.FLOAT),
+	('volume', 'volume', frames.FLOAT),
+	('open_interest', 'open_interest', frames.FLOAT),
+	('implied_volatility', 'implied_volatility', frames.FLOAT),
+	('delta', 'delta', frames.FLOAT),
+	('gamma', 'gamma', frames.FLOAT),
+	('theta', 'theta', frames.FLOAT),
+	('vega', 'vega', frames.FLOAT),
+	('rho', 'rho', frames.FLOAT),
+]
+
+
+def chain(trader, symbol):
+	"""Returns the (cached) options chain json of a stock"""
+	symbol = symbol.upper()
+
+	def fetch(key):
+		instrument_id = trader.instrument(symbol)['id']
+		return trader._req_get(endpoints.chain(instrument_id))['results'][0]
+
+	return trader._options_cache.get_or_fetch(('chain', symbol), fetch)
+
+
+def instruments(trader, symbol, expiration_dates=None, option_type=None):
+	"""
+	Returns the (cached) option instruments of a chain.
+
+	Args:
+		expiration_dates: list of 'yyyy-mm-dd' dates, defaults to every expiration of the chain
+		option_type: 'call' or 'put', defaults to both
+	"""
+	option_chain = chain(trader, symbol)
+	if isinstance(expiration_dates, str):
+		expiration_dates = [expiration_dates]
+	if not expiration_dates:
+		expiration_dates = option_chain['expiration_dates']
+	types = [option_type] if option_type else option_types
+	assert all(t in option_types for t in types)
+
+	def fetch(key):
+		_, dates, kind = key
+		url = endpoints.options(option_chain['id'], ','.join(dates), kind)
+		return [instrument for page in trader._req_get_pages(url) for instrument in page]
+
+	keys = [('instruments', tuple(dates), kind)
+			for dates in _chunks(expiration_dates, dates_batch_size)
+			for kind in types]
+	results = trader._options_cache.get_many(keys, fetch, trader.max_workers)
+	return [instrument for key in keys for instrument in results[key]]
+
+
+def market_data(trader, instrument_urls):
+	"""
+	Fetch option market data for many contracts, `option_batch_size` contracts per request,
+	batches are requested concurrently. Returns {instrument_url: market_data}
+	"""
+	def fetch(batch):
+		return trader._req_get(endpoints.market_data_many(batch))['results']
+
+	batches = concurrent_map(fetch, _chunks(instrument_urls, trader.option_batch_size), trader.max_workers)
+	return {data['instrument']: data for batch in batches for data in batch if data}
+
+
+def options_frame(trader, symbol, expiration_dates=None, option_type=None):
+	"""Returns the options chain with its market data as a typed DataFrame (one row per contract)"""
+	contracts = instruments(trader, symbol, expiration_dates, option_type)
+	urls = [contract['url'] for contract in contracts]
+	data = market_data(trader, urls)
+
+	df = ColumnBuffer(frame_columns).extend(contracts).to_frame()
+	quotes = ColumnBuffer(market_data_columns).extend(data.get(url, {}) for url in urls).to_frame()
+	df = df.join(quotes)
+	return df.sort_values(['expiration_date', 'type', 'strike'], ignore_index=True)
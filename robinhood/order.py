@@ -1,7 +1,12 @@
 from .detail.const_dict import ConstDict
 from .detail.common import timestamp_now, _to_float
+from .detail import frames
+from .detail.tracing import trace_methods
 from datetime import datetime
 
+# states after which an order can no longer change
+final_states = ['filled', 'cancelled', 'canceled', 'rejected', 'failed']
+
 
 class OrderBase(ConstDict):
 	def __init__(self, order: dict, init_local_time=True):
@@ -14,6 +19,7 @@ class OrderBase(ConstDict):
 		return self._dict['time'] if 'time' in self._dict else None
 
 
+@trace_methods(lambda order: order._trader.tracer)
 class Order(OrderBase):
 	"""
 	Example json:
@@ -36,6 +42,35 @@ class Order(OrderBase):
 	}
 	"""
 
+	# (column, json key, kind) used by `Trader.orders_frame`
+	frame_columns = [
+		('id', 'id', frames.STR),
+		('ref_id', 'ref_id', frames.STR),
+		('account', 'account', frames.STR),
+		('instrument', 'instrument', frames.STR),
+		('side', 'side', frames.CATEGORY),
+		('type', 'type', frames.CATEGORY),
+		('trigger', 'trigger', frames.CATEGORY),
+		('state', 'state', frames.CATEGORY),
+		('time_in_force', 'time_in_force', frames.CATEGORY),
+		('price', 'price', frames.FLOAT),
+		('stop_price', 'stop_price', frames.FLOAT),
+		('average_price', 'average_price', frames.FLOAT),
+		('quantity', 'quantity', frames.FLOAT),
+		('cumulative_quantity', 'cumulative_quantity', frames.FLOAT),
+		('fees', 'fees', frames.FLOAT),
+		('extended_hours', 'extended_hours', frames.BOOL),
+		('created_at', 'created_at', frames.DATETIME),
+		('updated_at', 'updated_at', frames.DATETIME),
+		('last_transaction_at', 'last_transaction_at', frames.DATETIME),
+	]
+	frame_executions = ('executions', [
+		('execution_id', 'id', frames.STR),
+		('execution_price', 'price', frames.FLOAT),
+		('execution_quantity', 'quantity', frames.FLOAT),
+		('execution_timestamp', 'timestamp', frames.DATETIME),
+	])
+
 	def __init__(self, trader, order: dict, init_local_time=True):
 		OrderBase.__init__(self, order, init_local_time)
 		self._trader = trader
@@ -45,7 +80,7 @@ class Order(OrderBase):
 		update_dict = self._trader.order(self._dict)._dict
 
 		# historical orders will not have time,
-		# orders made during this session will have a pd.Timestamp added to them
+		# orders made during this session will have a datetime added to them
 		if 'time' in self:
 			update_dict['time'] = self.time
 
@@ -87,6 +122,7 @@ class Order(OrderBase):
 		return self._dict['quantity']
 
 
+@trace_methods(lambda order: order._trader.tracer)
 class CryptoOrder(Order):
 	"""
 	Example json:
@@ -112,12 +148,33 @@ class CryptoOrder(Order):
 	}
 	"""
 
+	frame_columns = [
+		('id', 'id', frames.STR),
+		('ref_id', 'ref_id', frames.STR),
+		('account_id', 'account_id', frames.STR),
+		('currency_pair_id', 'currency_pair_id', frames.STR),
+		('side', 'side', frames.CATEGORY),
+		('type', 'type', frames.CATEGORY),
+		('state', 'state', frames.CATEGORY),
+		('time_in_force', 'time_in_force', frames.CATEGORY),
+		('price', 'price', frames.FLOAT),
+		('average_price', 'average_price', frames.FLOAT),
+		('quantity', 'quantity', frames.FLOAT),
+		('cumulative_quantity', 'cumulative_quantity', frames.FLOAT),
+		('rounded_executed_notional', 'rounded_executed_notional', frames.FLOAT),
+		('created_at', 'created_at', frames.DATETIME),
+		('updated_at', 'updated_at', frames.DATETIME),
+		('last_transaction_at', 'last_transaction_at', frames.DATETIME),
+	]
+	frame_executions = ('executions', [
+		('execution_id', 'id', frames.STR),
+		('execution_price', 'effective_price', frames.FLOAT),
+		('execution_quantity', 'quantity', frames.FLOAT),
+		('execution_timestamp', 'timestamp', frames.DATETIME),
+	])
+
 	def update(self):
-		# TODO- can we find a way to query a single crypto-order?
-		order_id = self._dict['id']
-		orders = self._trader.crypto_orders()
-		crypto_order = next(order for order in orders if order['id'] == order_id)
-		update_dict = crypto_order._dict
+		update_dict = self._trader.order(self._dict)._dict
 		if self.time:
 			update_dict['time'] = self.time
 
@@ -0,0 +1,375 @@
+"""
+Paper trading: a simulated robinhood backend.
+
+A PaperBroker answers the requests a Trader sends (orders, cancels, accounts,
+quotes, instruments, positions) from memory, and fills orders against the quotes
+and bars it is fed. Trader and CryptoTrader methods work unchanged and return
+genuine Order/CryptoOrder objects.
+
+	broker = PaperBroker(cash=10000)
+	trader = broker.attach(Trader())
+	broker.set_quote('AAPL', bid=250.0, ask=250.1)
+	order = trader.buy('aapl', 10)
+
+	for time, bar in trader.historical_quotes('aapl', '5minute', 'week').iterrows():
+		broker.on_bar('AAPL', bar.open, bar.high, bar.low, bar.close, time)
+		... strategy ...
+
+Orders placed through the Trader go through its request path, `broker.submit(payload)` skips
+it and is about 4 times faster (a loop of market orders, the absolute rates depend on the machine).
+
+Fill rules:
+	market orders fill at the ask (buy) or bid (sell), or at the next bar's open
+	limit orders fill when the ask/bid (or the bar's range) crosses the limit, at the better of open and limit
+	stop orders trigger when the price reaches the stop and then behave as market (or limit) orders,
+	trailing stops are simulated as plain stops at the stop price sent with the order
+"""
+from . import endpoints
+from . import crypto_endpoints
+from .order import final_states
+from .transport import Response
+from urllib.parse import urlsplit, parse_qs
+from datetime import datetime, timezone
+from json import loads
+import itertools
+import time as _time
+
+_crypto_symbols = {pair_id: symbol + 'USD' for symbol, pair_id in crypto_endpoints.crypto_pairs.items()}
+_crypto_host = urlsplit(crypto_endpoints.crypto_base_url).netloc
+
+
+def _is_crypto(order):
+	return 'currency_pair_id' in order
+
+
+def _isoformat(time):
+	if time is None:
+		time = datetime.now(timezone.utc)
+	elif not isinstance(time, datetime):
+		import pandas as pd
+		time = pd.Timestamp(time).to_pydatetime()
+	if time.tzinfo is None:
+		time = time.replace(tzinfo=timezone.utc)
+	return time.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+class PaperBroker:
+	"""
+	Args:
+		cash: starting cash
+		allow_short: if False, sells larger than the position are rejected
+	"""
+
+	account_id = 'paper'
+
+	def __init__(self, cash=100000.0, allow_short=False):
+		self.cash = float(cash)
+		self.allow_short = allow_short
+		self.time = None
+		self.quotes = {}      # symbol -> {'bid', 'ask', 'last'}
+		self.positions = {}   # symbol -> [quantity, average price]
+		self.orders = {}      # id -> order json
+		self._open = {}       # symbol -> {id: open order json}
+		self._touched = {}    # id -> wall clock time of the last change
+		self._untriggered = set()  # ids of stop orders waiting for their stop price
+		self._ids = itertools.count(1)
+		self._routes = [
+			('POST', '/cancel/', self._post_cancel),
+			('POST', '/orders/', self._post_order),
+			('GET', '/orders/', self._get_orders),
+			('GET', '/accounts/', self._get_accounts),
+			('GET', '/quotes/', self._get_quotes),
+			('GET', '/instruments/', self._get_instruments),
+			('GET', '/positions/', self._get_positions),
+			('GET', '/portfolios/', self._get_portfolios),
+		]
+
+	def attach(self, trader):
+		"""Points a Trader (and its CryptoTrader) at this broker, returns the trader"""
+		trader.transport = self
+		trader.rate_limiter = None
+		return trader
+
+	###########################################################################
+	#                               Market data
+	###########################################################################
+
+	def set_quote(self, symbol, bid, ask=None, last=None, time=None):
+		"""Updates the market of a symbol and fills the open orders it crosses"""
+		symbol = symbol.upper()
+		ask = bid if ask is None else ask
+		last = (bid + ask) / 2 if last is None else last
+		self.quotes[symbol] = {'bid': float(bid), 'ask': float(ask), 'last': float(last)}
+		if time is not None:
+			self.time = time
+		for order in list(self._open.get(symbol, {}).values()):
+			self._try_fill(order, ask=ask, bid=bid)
+
+	def on_bar(self, symbol, open, high, low, close, time=None):
+		"""Fills the open orders of a symbol against a bar, the quote is then set to the close"""
+		symbol = symbol.upper()
+		if time is not None:
+			self.time = time
+		for order in list(self._open.get(symbol, {}).values()):
+			self._try_fill_bar(order, float(open), float(high), float(low))
+		self.quotes[symbol] = {'bid': float(close), 'ask': float(close), 'last': float(close)}
+
+	def run_bars(self, symbol, bars, on_bar=None):
+		"""
+		Feeds a `historical_quotes` DataFrame bar by bar,
+		`on_bar(broker, time, bar)` is called after each bar (the strategy)
+		"""
+		for time, bar in bars.iterrows():
+			self.on_bar(symbol, bar['open'], bar['high'], bar['low'], bar['close'], time)
+			if on_bar:
+				on_bar(self, time, bar)
+
+	###########################################################################
+	#                               Account
+	###########################################################################
+
+	def position(self, symbol):
+		return self.positions.get(symbol.upper(), [0.0, 0.0])[0]
+
+	@property
+	def equity(self) -> float:
+		return self.cash + sum(quantity * self.quotes.get(symbol, {}).get('last', price)
+							   for symbol, (quantity, price) in self.positions.items())
+
+	###########################################################################
+	#                               Orders
+	###########################################################################
+
+	def submit(self, payload, crypto=False):
+		"""Creates an order from a Trader/CryptoTrader order payload, returns the order json"""
+		order_id = f'{next(self._ids):012d}'
+		if crypto:
+			symbol = _crypto_symbols[payload['currency_pair_id']]
+			base = crypto_endpoints.orders() + order_id + '/'
+			cancel_key = 'cancel_url'
+		else:
+			symbol = payload['symbol'].upper()
+			base = endpoints.orders(order_id)
+			cancel_key = 'cancel'
+
+		now = _isoformat(self.time)
+		order = dict(payload)
+		order.update({
+			'id': order_id,
+			'url': base,
+			cancel_key: base + 'cancel/',
+			'symbol': symbol,
+			'state': 'confirmed' if crypto else 'queued',
+			'quantity': str(payload['quantity']),
+			'cumulative_quantity': '0',
+			'average_price': None,
+			'executions': [],
+			'fees': '0.00',
+			'created_at': now,
+			'updated_at': now,
+		})
+		self.orders[order_id] = order
+		if payload.get('trigger') == 'stop':
+			self._untriggered.add(order_id)
+		self._touch(order)
+
+		quote = self.quotes.get(symbol)
+		if quote is None or not self._try_fill(order, ask=quote['ask'], bid=quote['bid']):
+			if order['state'] not in final_states:
+				self._open.setdefault(symbol, {})[order_id] = order
+		return self._public(order)
+
+	def cancel(self, order_id):
+		order = self.orders[order_id]
+		if order['state'] not in final_states:
+			self._close(order, 'canceled' if _is_crypto(order) else 'cancelled')
+		return self._public(order)
+
+	def _touch(self, order):
+		self._touched[order['id']] = _time.time()
+
+	def _public(self, order):
+		return dict(order)
+
+	def _close(self, order, state):
+		order['state'] = state
+		order['updated_at'] = _isoformat(self.time)
+		self._touch(order)
+		self._open.get(order['symbol'], {}).pop(order['id'], None)
+
+	def _limit(self, order):
+		return float(order['price']) if order.get('type') == 'limit' and order.get('price') else None
+
+	def _try_fill(self, order, ask, bid):
+		"""Fills against a quote, returns True if the order was closed"""
+		side = order['side']
+		if order['id'] in self._untriggered:
+			stop = float(order['stop_price'])
+			if (side == 'buy' and ask >= stop) or (side == 'sell' and bid <= stop):
+				self._untriggered.discard(order['id'])
+			else:
+				return False
+
+		price = ask if side == 'buy' else bid
+		limit = self._limit(order)
+		if limit is not None and ((side == 'buy' and price > limit) or (side == 'sell' and price < limit)):
+			return False
+		return self._fill(order, price)
+
+	def _try_fill_bar(self, order, open, high, low):
+		side = order['side']
+		price = open
+		if order['id'] in self._untriggered:
+			stop = float(order['stop_price'])
+			if side == 'buy' and high >= stop:
+				price = max(open, stop)
+			elif side == 'sell' and low <= stop:
+				price = min(open, stop)
+			else:
+				return False
+			self._untriggered.discard(order['id'])
+
+		limit = self._limit(order)
+		if limit is not None:
+			if side == 'buy':
+				if low > limit:
+					return False
+				price = min(price, limit)
+			else:
+				if high < limit:
+					return False
+				price = max(price, limit)
+		return self._fill(order, price)
+
+	def _fill(self, order, price):
+		symbol = order['symbol']
+		side = order['side']
+		quantity = float(order['quantity'])
+		held, average = self.positions.get(symbol, [0.0, 0.0])
+
+		if side == 'buy' and quantity * price > self.cash + 1e-9:
+			order['reject_reason'] = 'insufficient buying power'
+			self._close(order, 'rejected')
+			return True
+		if side == 'sell' and not self.allow_short and quantity > held + 1e-9:
+			order['reject_reason'] = 'insufficient shares'
+			self._close(order, 'rejected')
+			return True
+
+		if side == 'buy':
+			self.cash -= quantity * price
+			total = held + quantity
+			average = (held * average + quantity * price) / total if total else 0.0
+			held = total
+		else:
+			self.cash += quantity * price
+			held -= quantity
+		if held:
+			self.positions[symbol] = [held, average]
+		else:
+			self.positions.pop(symbol, None)
+
+		now = _isoformat(self.time)
+		execution = {'id': order['id'] + '-1', 'quantity': order['quantity'], 'timestamp': now}
+		execution['effective_price' if _is_crypto(order) else 'price'] = str(price)
+		order['executions'] = [execution]
+		order['cumulative_quantity'] = order['quantity']
+		order['average_price'] = str(price)
+		order['last_transaction_at'] = now
+		self._close(order, 'filled')
+		return True
+
+	###########################################################################
+	#                               Request routing
+	###########################################################################
+
+	def request(self, method, url, data=None, params=None, **kwargs):
+		"""Transport entry point (see `robinhood.transport`)"""
+		parts = urlsplit(url)
+		query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+		if params:
+			query.update(params)
+		crypto = parts.netloc == _crypto_host
+		if '/marketdata/forex/quotes/' in parts.path:
+			return self._get_crypto_quote(parts.path)
+		for route_method, fragment, handler in self._routes:
+			if route_method == method and fragment in parts.path:
+				return handler(parts.path, query, data, crypto)
+		return Response({'detail': f'{method} {url} is not simulated'}, 404)
+
+	def get(self, url, **kwargs):
+		return self.request('GET', url, **kwargs)
+
+	def post(self, url, **kwargs):
+		return self.request('POST', url, **kwargs)
+
+	def _post_order(self, path, query, data, crypto):
+		payload = loads(data) if isinstance(data, (str, bytes)) else dict(data)
+		return Response(self.submit(payload, crypto), 201)
+
+	def _post_cancel(self, path, query, data, crypto):
+		order_id = path.rstrip('/').split('/')[-2]
+		if order_id not in self.orders:
+			return Response({'detail': 'Not found.'}, 404)
+		self.cancel(order_id)
+		return Response({})
+
+	def _get_orders(self, path, query, data, crypto):
+		order_id = path.rstrip('/').split('/')[-1]
+		if order_id != 'orders':
+			if order_id not in self.orders:
+				return Response({'detail': 'Not found.'}, 404)
+			return Response(self._public(self.orders[order_id]))
+
+		orders = [o for o in self.orders.values() if _is_crypto(o) == crypto]
+		since = query.get('updated_at[gte]')
+		if since:
+			since = datetime.strptime(since, '%Y-%m-%dT%H:%M:%S.%fZ').replace(tzinfo=timezone.utc).timestamp()
+			orders = [o for o in orders if self._touched[o['id']] >= since]
+		return Response({'next': None, 'previous': None, 'results': [self._public(o) for o in reversed(orders)]})
+
+	def _get_accounts(self, path, query, data, crypto):
+		account = {'id': self.account_id, 'url': endpoints.accounts() + self.account_id + '/',
+				   'cash': str(self.cash), 'buying_power': str(self.cash)}
+		return Response({'next': None, 'results': [account]})
+
+	def _quote_json(self, symbol):
+		quote = self.quotes.get(symbol)
+		if quote is None:
+			return None
+		return {'symbol': symbol, 'bid_price': str(quote['bid']), 'ask_price': str(quote['ask']),
+				'last_trade_price': str(quote['last']), 'mark_price': str(quote['last']),
+				'bid_size': 0, 'ask_size': 0, 'updated_at': _isoformat(self.time),
+				'instrument': endpoints.instruments(symbol)}
+
+	def _get_quotes(self, path, query, data, crypto):
+		symbols = query.get('symbols', '').split(',')
+		return Response({'results': [self._quote_json(symbol.upper()) for symbol in symbols]})
+
+	def _get_crypto_quote(self, path):
+		symbol = _crypto_symbols.get(path.rstrip('/').split('/')[-1])
+		quote = self._quote_json(symbol)
+		if quote is None:
+			return Response({'detail': 'Not found.'}, 404)
+		return Response(quote)
+
+	def _instrument(self, symbol):
+		return {'id': symbol, 'symbol': symbol, 'url': endpoints.instruments(symbol), 'simple_name': symbol,
+				'tradeable': True, 'tradability': 'tradable', 'state': 'active', 'type': 'stock',
+				'min_tick_size': None, 'fractional_tradability': 'tradable'}
+
+	def _get_instruments(self, path, query, data, crypto):
+		if 'symbol' in query:
+			return Response({'next': None, 'results': [self._instrument(query['symbol'].upper())]})
+		return Response(self._instrument(path.rstrip('/').split('/')[-1]))
+
+	def _get_positions(self, path, query, data, crypto):
+		positions = [{'instrument': endpoints.instruments(symbol), 'quantity': str(quantity),
+					  'average_buy_price': str(price), 'account': endpoints.accounts() + self.account_id + '/'}
+					 for symbol, (quantity, price) in self.positions.items()]
+		return Response({'next': None, 'results': positions})
+
+	def _get_portfolios(self, path, query, data, crypto):
+		equity = self.equity
+		return Response({'next': None, 'results': [{'equity': str(equity), 'market_value': str(equity - self.cash),
+												   'withdrawable_amount': str(self.cash)}]})
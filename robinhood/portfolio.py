@@ -0,0 +1,75 @@
+from . import endpoints
+from .detail.common import timestamp_now
+
+
+class PortfolioSnapshot:
+	"""
+	Valuation of every stock position at a point in time.
+
+	Positions are paged in full, their instruments are resolved through the
+	trader's instrument cache (concurrently) and quotes are fetched in batches,
+	so refreshing the snapshot costs roughly `pages + instruments not cached + symbols / quote_batch_size`
+	requests instead of two requests per position.
+
+	`frame` columns:
+		symbol, instrument, quantity, average_buy_price, price,
+		cost_basis, market_value, unrealized_pl, unrealized_pl_percent
+	"""
+
+	def __init__(self, trader, nonzero=True, refresh=True):
+		self._trader = trader
+		self.nonzero = nonzero
+		self.frame = None
+		self.time = None
+		if refresh:
+			self.refresh()
+
+	def refresh(self):
+		"""Reload positions and quotes, recomputing every value"""
+		import pandas as pd
+
+		url = endpoints.positions() + ('?nonzero=true' if self.nonzero else '')
+		positions = [position for page in self._trader._req_get_pages(url) for position in page]
+
+		urls = [position['instrument'] for position in positions]
+		instruments = self._trader.instruments(urls)
+		symbols = [instruments[url]['symbol'] for url in urls]
+		quotes = self._trader.quotes(symbols)
+
+		df = pd.DataFrame({
+			'symbol': symbols,
+			'instrument': urls,
+			'quantity': [position['quantity'] for position in positions],
+			'average_buy_price': [position['average_buy_price'] for position in positions],
+			'price': [quote['last_trade_price'] if quote else None for quote in quotes],
+		})
+		for column in ['quantity', 'average_buy_price', 'price']:
+			df[column] = pd.to_numeric(df[column], errors='coerce').astype('float64')
+
+		df['cost_basis'] = df['quantity'] * df['average_buy_price']
+		df['market_value'] = df['quantity'] * df['price']
+		df['unrealized_pl'] = df['market_value'] - df['cost_basis']
+		df['unrealized_pl_percent'] = df['unrealized_pl'] / df['cost_basis'].where(df['cost_basis'] != 0) * 100
+		df.set_index('symbol', inplace=True, drop=False)
+
+		self.frame = df
+		self.time = timestamp_now()
+		return self
+
+	@property
+	def market_value(self) -> float:
+		return float(self.frame['market_value'].sum())
+
+	@property
+	def cost_basis(self) -> float:
+		return float(self.frame['cost_basis'].sum())
+
+	@property
+	def unrealized_pl(self) -> float:
+		return float(self.frame['unrealized_pl'].sum())
+
+	def __len__(self):
+		return len(self.frame) if self.frame is not None else 0
+
+	def __repr__(self):
+		return repr(self.frame)
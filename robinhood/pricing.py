@@ -0,0 +1,168 @@
+"""
+Vectorized Black-Scholes pricing, greeks and implied volatility.
+
+Every function accepts scalars or numpy arrays (broadcast together), so a whole
+options chain is priced in a handful of array operations.
+
+Conventions follow Robinhood's market data:
+	theta is per calendar day, vega and rho are per 1% change.
+"""
+import numpy as np
+
+days_per_year = 365.0
+_min_time = 1e-6   # years, avoids division by zero at expiry
+_min_vol = 1e-4
+_max_vol = 5.0
+
+
+def norm_pdf(x):
+	return np.exp(-0.5 * x * x) / np.sqrt(2 * np.pi)
+
+
+def norm_cdf(x):
+	"""Standard normal cdf, (Abramowitz and Stegun 7.1.26, |error| < 1.5e-7)"""
+	x = np.asarray(x, dtype=float)
+	z = np.abs(x) / np.sqrt(2)
+	t = 1.0 / (1.0 + 0.3275911 * z)
+	poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+	erf = 1.0 - poly * np.exp(-z * z)
+	return 0.5 * (1.0 + np.sign(x) * erf)
+
+
+def _d1_d2(spot, strike, time, rate, volatility, dividend_yield):
+	time = np.maximum(time, _min_time)
+	vol_sqrt_t = volatility * np.sqrt(time)
+	d1 = (np.log(spot / strike) + (rate - dividend_yield + 0.5 * volatility ** 2) * time) / vol_sqrt_t
+	return d1, d1 - vol_sqrt_t, time
+
+
+def price(spot, strike, time, volatility, is_call, rate=0.0, dividend_yield=0.0):
+	"""
+	Args:
+		spot: underlying price
+		strike: strike price
+		time: years to expiration
+		volatility: annualized volatility (0.25 -> 25%)
+		is_call: bool or bool array (False -> put)
+		rate: continuously compounded risk free rate
+		dividend_yield: continuous dividend yield
+	"""
+	d1, d2, time = _d1_d2(spot, strike, time, rate, volatility, dividend_yield)
+	spot_df = spot * np.exp(-dividend_yield * time)
+	strike_df = strike * np.exp(-rate * time)
+	call = spot_df * norm_cdf(d1) - strike_df * norm_cdf(d2)
+	put = strike_df * norm_cdf(-d2) - spot_df * norm_cdf(-d1)
+	return np.where(is_call, call, put)
+
+
+def greeks(spot, strike, time, volatility, is_call, rate=0.0, dividend_yield=0.0):
+	"""Returns {'delta', 'gamma', 'theta', 'vega', 'rho'} arrays (see module conventions)"""
+	d1, d2, time = _d1_d2(spot, strike, time, rate, volatility, dividend_yield)
+	sqrt_t = np.sqrt(time)
+	q_df = np.exp(-dividend_yield * time)
+	r_df = np.exp(-rate * time)
+	pdf_d1 = norm_pdf(d1)
+	cdf_d1, cdf_d2 = norm_cdf(d1), norm_cdf(d2)
+
+	gamma = q_df * pdf_d1 / (spot * volatility * sqrt_t)
+	vega = spot * q_df * pdf_d1 * sqrt_t
+	decay = -spot * q_df * pdf_d1 * volatility / (2 * sqrt_t)
+
+	call_theta = decay - rate * strike * r_df * cdf_d2 + dividend_yield * spot * q_df * cdf_d1
+	put_theta = decay + rate * strike * r_df * (1 - cdf_d2) - dividend_yield * spot * q_df * (1 - cdf_d1)
+
+	return {
+		'delta': np.where(is_call, q_df * cdf_d1, q_df * (cdf_d1 - 1)),
+		'gamma': gamma,
+		'theta': np.where(is_call, call_theta, put_theta) / days_per_year,
+		'vega': vega / 100,
+		'rho': np.where(is_call, strike * time * r_df * cdf_d2, -strike * time * r_df * (1 - cdf_d2)) / 100,
+	}
+
+
+def implied_volatility(option_price, spot, strike, time, is_call, rate=0.0, dividend_yield=0.0,
+					   tolerance=1e-6, max_iterations=50):
+	"""
+	Vectorized implied volatility, newton steps safeguarded by bisection.
+	Returns NaN where the price is outside of the no-arbitrage bounds,
+	or where it is not matched within `tolerance` after `max_iterations`.
+	"""
+	option_price, spot, strike, time, is_call = np.broadcast_arrays(
+		*[np.asarray(v, dtype=float) for v in (option_price, spot, strike, time, is_call)])
+	is_call = is_call.astype(bool)
+
+	low = np.full(option_price.shape, _min_vol)
+	high = np.full(option_price.shape, _max_vol)
+	vol = np.full(option_price.shape, 0.3)
+	valid = (price(spot, strike, time, low, is_call, rate, dividend_yield) <= option_price) & \
+			(option_price <= price(spot, strike, time, high, is_call, rate, dividend_yield))
+	active = valid.copy()
+
+	for _ in range(max_iterations):
+		if not active.any():
+			break
+		diff = price(spot, strike, time, vol, is_call, rate, dividend_yield) - option_price
+		active &= np.abs(diff) > tolerance
+
+		high = np.where(active & (diff > 0), vol, high)
+		low = np.where(active & (diff < 0), vol, low)
+
+		vega = greeks(spot, strike, time, vol, is_call, rate, dividend_yield)['vega'] * 100
+		with np.errstate(divide='ignore', invalid='ignore'):
+			newton = vol - diff / vega
+		bisect = (newton <= low) | (newton >= high) | ~np.isfinite(newton)
+		vol = np.where(active, np.where(bisect, 0.5 * (low + high), newton), vol)
+
+	converged = np.abs(price(spot, strike, time, vol, is_call, rate, dividend_yield) - option_price) <= tolerance
+	return np.where(valid & converged, vol, np.nan)
+
+
+def time_to_expiration(expiration_dates, now=None):
+	"""Years until the 16:00 (America/New_York) close of each expiration date"""
+	import pandas as pd
+
+	dates = pd.to_datetime(pd.Series(expiration_dates))
+	if dates.dt.tz is not None:
+		dates = dates.dt.tz_localize(None)
+	close = (dates.dt.normalize() + pd.Timedelta(hours=16)).dt.tz_localize('America/New_York')
+	now = pd.Timestamp.now(tz='UTC') if now is None else pd.Timestamp(now)
+	if now.tz is None:
+		now = now.tz_localize('UTC')
+	seconds = (close - now).dt.total_seconds().to_numpy()
+	return np.maximum(seconds / (days_per_year * 24 * 3600), 0.0)
+
+
+def chain_analytics(chain, spot, rate=0.0, dividend_yield=0.0, volatility=None, now=None, price_column='mark'):
+	"""
+	Computes implied volatility, theoretical price and greeks for every contract of
+	a chain loaded by `Trader.options_frame`, without any request.
+
+	Args:
+		chain: DataFrame with 'strike', 'expiration_date', 'type' and a price column
+		spot: underlying price
+		volatility: volatility used for the theoretical price and greeks,
+			defaults to each contract's implied volatility
+		price_column: market price used for implied volatility,
+			missing values fall back on the bid/ask midpoint
+
+	Returns: a copy of `chain` with the added columns
+		time_to_expiration, model_iv, model_price, model_delta, model_gamma, model_theta, model_vega, model_rho
+	"""
+	df = chain.copy()
+	market_price = df[price_column].astype(float)
+	if 'bid' in df and 'ask' in df:
+		market_price = market_price.fillna((df['bid'].astype(float) + df['ask'].astype(float)) / 2)
+
+	strike = df['strike'].to_numpy(dtype=float)
+	is_call = (df['type'].astype(str) == 'call').to_numpy()
+	time = time_to_expiration(df['expiration_date'], now)
+
+	iv = implied_volatility(market_price.to_numpy(dtype=float), spot, strike, time, is_call, rate, dividend_yield)
+	vol = iv if volatility is None else np.broadcast_to(np.asarray(volatility, dtype=float), iv.shape)
+
+	df['time_to_expiration'] = time
+	df['model_iv'] = iv
+	df['model_price'] = price(spot, strike, time, vol, is_call, rate, dividend_yield)
+	for name, values in greeks(spot, strike, time, vol, is_call, rate, dividend_yield).items():
+		df['model_' + name] = values
+	return df
@@ -1,7 +1,7 @@
 from .detail.const_dict import ConstDict
 from .detail.common import timestamp_now, _to_float
+from .detail import frames
 from datetime import datetime
-import pandas as pd
 
 
 class QuoteBase(ConstDict):
@@ -21,7 +21,7 @@ class QuoteBase(ConstDict):
 		return self._dict['symbol']
 
 	@property
-	def time(self) -> pd.Timestamp:
+	def time(self) -> datetime:
 		return self._dict['time']
 
 
@@ -47,6 +47,17 @@ class Quote(QuoteBase):
 		}
 	"""
 
+	# (column, json key, kind) used by DataFrame quote snapshots
+	frame_columns = [
+		('symbol', 'symbol', frames.STR),
+		('bid', 'bid_price', frames.FLOAT),
+		('ask', 'ask_price', frames.FLOAT),
+		('mark', 'last_trade_price', frames.FLOAT),
+		('bid_size', 'bid_size', frames.FLOAT),
+		('ask_size', 'ask_size', frames.FLOAT),
+		('quote_updated_at', 'updated_at', frames.DATETIME),
+	]
+
 	@property
 	def ask(self) -> float:
 		return self._get_float('ask_price')
@@ -62,6 +73,10 @@ class Quote(QuoteBase):
 	def mark(self) -> float:
 		return self._get_float('last_trade_price')
 
+	@property
+	def last_trade_price(self) -> float:
+		return self._get_float('last_trade_price')
+
 	@property
 	def previous_close(self) -> float:
 		return self._get_float('last_trade_price')
@@ -141,6 +156,7 @@ class HistoricalQuote(QuoteBase):
 	Note: historical quotes are the same for crypto/regular quotes
 	"""
 	def __init__(self, quote: dict):
+		import pandas as pd
 		QuoteBase.__init__(self, quote, pd.Timestamp(quote['begins_at']))
 
 	@property
@@ -1,35 +1,97 @@
-from .order import Order
+from .order import Order, final_states
+from .detail.frames import ColumnBuffer
 from .quote import Quote, HistoricalQuote
 
-from six.moves.urllib.request import getproxies
-from six.moves import input
+from urllib.request import getproxies
 
 import getpass
 import requests
 import uuid
 import pickle
+import threading
+import time
 
 from . import endpoints
-from six.moves.urllib.parse import unquote
+from . import crypto_endpoints
+from urllib.parse import unquote
 from json import dumps
 from .crypto_trader import CryptoTrader
-
-from .detail.common import _datelike_to_datetime
-
-class Trader:
+from .portfolio import PortfolioSnapshot
+from .dividends import dividends_frame as _dividends_frame
+from . import options as _options
+from .fundamentals import fundamentals_many as _fundamentals_many
+from . import universe as _universe
+
+from .detail.common import _datelike_to_datetime, _chunks, concurrent_map, _records, _updated_since, Picklable
+from .detail.cache import Cache, QuoteCache
+from .detail.ratelimit import RateLimiter
+from .detail.metrics import endpoint_template
+from .detail.tracing import trace_methods
+from .validation import validate_order, validate_orders, tick_size, format_price
+from .credentials import CredentialStore, is_expired
+from .markets import MarketCalendar, poll as _poll, watch_orders as _watch_orders
+
+@trace_methods(lambda trader: trader.tracer,
+               unrecorded={'login', 'refresh_login', 'login_from_credentials', 'save_credentials', 'logout'},
+               untraced={'watch_orderbook'})
+class Trader(Picklable):
 
     client_id = "c82SH0WZOsabOXGP2sxqcj34FxkvfnWRZBKlBjFS"
     request_timeout = 15
+    max_workers = 8         # thread pool size used for concurrent requests
+    quote_batch_size = 100  # symbols per `/quotes/` request
+    option_batch_size = 50  # contracts per `/marketdata/options/` request
+    metadata_ttl = 3600     # seconds instruments, chains and option instruments stay cached
+    invalid_symbol_ttl = 300  # seconds an unknown symbol is remembered (fails without a request)
+    fundamentals_batch_size = 100
+    fundamentals_ttl = 24 * 3600  # seconds fundamentals stay cached
+    order_timeout = 15      # seconds before an order submission is considered lost
+    order_retries = 2       # resubmissions of a timed out order (after checking it was not received)
+    order_lookup_delay = 2  # seconds before each of the two lookups of a timed out order
+    quote_staleness = 1.0   # seconds a cached quote may be reused to price an order
+    token_refresh_margin = 300  # seconds before expiry the access token is renewed in the background
+    token_refresh_retry = 30    # min seconds between background renewals, doubled after each failed one
+    auto_refresh_token = True   # renew the access token in a background thread ahead of its expiry
+    keepalive_interval = 30     # seconds between the keepalive requests of `start_keepalive`
+    _post_headers = {
+        'Content-Type': 'application/json',
+        'Accept': '*/*',
+        'Sec-Fetch-Site': 'same-site',
+        'Sec-Fetch-Mode': 'cors',
+        'Accept-Encoding': 'gzip, deflate, br',
+        'Accept-Language': 'en-US,en;q=0.9',
+    }
+    # not pickled by save_session, the token refresh thread is restarted by __setstate__
+    _unpickled = {'_token_lock': lambda self: threading.Lock(),
+                  '_token_refresher': lambda self: None,
+                  '_keepalive': lambda self: None}
     ###########################################################################
     #                       Logging in and initializing
     ###########################################################################
 
-    def __init__(self, username=None, password=None):
+    def __init__(self, username=None, password=None, transport=None):
+        self.tracer = None  # set to a `Tracer` to record spans of operations and their requests
         self._crypto_trader = CryptoTrader(self)
+        self.transport = transport  # see `robinhood.transport`, defaults to `session`
+        self._instrument_cache = Cache(ttl=self.metadata_ttl)
+        self._invalid_symbols = Cache(ttl=self.invalid_symbol_ttl)
+        self._options_cache = Cache(ttl=self.metadata_ttl)
+        self._fundamentals_cache = Cache()
+        self._quote_cache = QuoteCache()
+        self.rate_limiter = RateLimiter()  # 429/Retry-After backoff, client side limits are opt-in
+        self.metrics = None  # set to a `Metrics` to record per endpoint request metrics
+        self.response_cache = None  # set to a `ResponseCache` to cache (and revalidate) slow-changing endpoints
+        self._market_calendar = None
         self.auth_token = None
         self.session = requests.session()
         self.session.proxies = getproxies()
         self.refresh_token = None
+        self.token_expires_at = None  # unix time the access token expires
+        self.device_token = None
+        self.credential_store = None  # `CredentialStore` updated whenever the tokens change
+        self._token_lock = threading.Lock()
+        self._token_refresher = None
+        self._keepalive = None
         self.session.headers = {
             "Accept": "*/*",
             "Accept-Encoding": "gzip, deflate",
@@ -61,13 +123,15 @@ class Trader:
             print('password:', end='')
             password = getpass.getpass()
         if not device_token:
-            device_token = uuid.uuid1()
+            device_token = self.device_token or uuid.uuid1()
+        if isinstance(device_token, uuid.UUID):
+            device_token = device_token.hex
 
         payload = {
             'username': username,
             'password': password,
             'grant_type': 'password',
-            'device_token': device_token.hex,
+            'device_token': device_token,
             "token_type": "Bearer",
             'expires_in': 603995,
             "scope": "internal",
@@ -80,7 +144,7 @@ class Trader:
         else:
             payload['challenge_type'] = 'sms'
 
-        res = self.session.post(endpoints.login(), data=payload, timeout=self.request_timeout, verify=True)
+        res = self._send('POST', endpoints.login(), data=payload, timeout=self.request_timeout, verify=True)
         if not res:
             print(res.text)
             res.raise_for_status()
@@ -91,13 +155,137 @@ class Trader:
             return self.login(username, password, mfa_code, device_token)
 
         if 'access_token' in data.keys() and 'refresh_token' in data.keys():
-            self.auth_token = data['access_token']
-            self.refresh_token = data['refresh_token']
-            self.session.headers['Authorization'] = 'Bearer ' + self.auth_token
+            self.device_token = device_token
+            self._set_tokens(data)
             return res
 
         return False
 
+    def refresh_login(self, refresh_token=None):
+        """Renews the access token with the refresh token (no password or MFA prompt)
+
+        Returns:
+            (:obj:`requests.request`) result from the token endpoint
+        """
+        refresh_token = refresh_token or self.refresh_token
+        if not refresh_token:
+            raise Exception("No refresh token, login first")
+
+        payload = {
+            'grant_type': 'refresh_token',
+            'refresh_token': refresh_token,
+            'scope': 'internal',
+            'expires_in': 603995,
+            'client_id': self.client_id,
+            'device_token': self.device_token,
+        }
+        res = self._send('POST', endpoints.login(), data=payload, timeout=self.request_timeout, verify=True)
+        if not res:
+            print(res.text)
+            res.raise_for_status()
+        data = res.json()
+        if 'access_token' not in data:
+            raise Exception(f"Token refresh failed: {data}")
+
+        self._set_tokens(dict(data, refresh_token=data.get('refresh_token') or refresh_token))
+        return res
+
+    def _set_tokens(self, data):
+        """Installs the tokens of a token endpoint response (or of stored credentials)"""
+        expires_at = data.get('expires_at')
+        if not expires_at and data.get('expires_in'):
+            expires_at = time.time() + float(data['expires_in'])
+
+        self.auth_token = data['access_token']
+        self.refresh_token = data['refresh_token']
+        # a single item assignment: requests in flight keep the header they were sent with,
+        # the following ones get the new token, nothing waits on the renewal
+        self.session.headers['Authorization'] = 'Bearer ' + self.auth_token
+        self.token_expires_at = expires_at
+        if self.credential_store:
+            self.credential_store.save(self.credentials())
+        if self.auto_refresh_token and expires_at:
+            self.start_token_refresh()
+
+    def _renew_token(self, expires_at):
+        """Renews the access token unless another thread already renewed the token expiring at `expires_at`"""
+        with self._token_lock:
+            if self.token_expires_at != expires_at:
+                return False
+            self.refresh_login()
+            return True
+
+    def start_token_refresh(self):
+        """Starts the background thread renewing the access token
+            `token_refresh_margin` seconds before it expires (started by login when `auto_refresh_token`)"""
+        refresher = self._token_refresher
+        if refresher and refresher[0].is_alive() and not refresher[1].is_set():
+            return
+        stop = threading.Event()
+        thread = threading.Thread(target=self._token_refresh_loop, args=(stop,), name='robinhood-token-refresh', daemon=True)
+        self._token_refresher = (thread, stop)
+        thread.start()
+
+    def stop_token_refresh(self):
+        if self._token_refresher:
+            self._token_refresher[1].set()
+            self._token_refresher = None
+
+    def _token_refresh_loop(self, stop):
+        failures = 0
+        while not stop.is_set():
+            expires_at = self.token_expires_at
+            if not expires_at or not self.refresh_token:
+                return
+            # tokens living less than twice the margin are renewed at half their remaining life,
+            # never sooner than `token_refresh_retry` seconds (doubled after each failed renewal)
+            remaining = expires_at - time.time()
+            backoff = min(self.token_refresh_retry * 2 ** failures, 3600)
+            if stop.wait(max(remaining - self.token_refresh_margin, remaining / 2, backoff)):
+                return
+            try:
+                self._renew_token(expires_at)
+                failures = 0
+            except Exception:
+                # requests renew an expired token themselves
+                failures += 1
+
+    def credentials(self):
+        """The current login as a json-able dict (see `save_credentials`)"""
+        return {
+            'access_token': self.auth_token,
+            'refresh_token': self.refresh_token,
+            'expires_at': self.token_expires_at,
+            'device_token': self.device_token,
+        }
+
+    def save_credentials(self, path):
+        """Saves the tokens to a json file (readable by its owner only),
+            resume the login with `login_from_credentials(path)`.
+            The file is kept up to date when the tokens are renewed"""
+        self.credential_store = CredentialStore(path)
+        self.credential_store.save(self.credentials())
+
+    def login_from_credentials(self, path):
+        """Resumes a login saved with `save_credentials`, the stored access token is reused
+            while valid, else it is renewed with the refresh token (a single request).
+
+        Returns:
+            self
+        """
+        store = CredentialStore(path)
+        credentials = store.load()
+        if not credentials or not credentials.get('refresh_token'):
+            raise Exception(f"No credentials stored in {path}")
+
+        self.device_token = credentials.get('device_token')
+        self.credential_store = store
+        if is_expired(credentials):
+            self.refresh_login(credentials['refresh_token'])
+        else:
+            self._set_tokens(credentials)
+        return self
+
     def logout(self):
         """Logout from robinhood
 
@@ -109,29 +297,84 @@ class Trader:
             'client_id': self.client_id,
             'token': self.refresh_token
         }
-        res = self.session.post(endpoints.logout(), data=payload, timeout=self.request_timeout)
+        res = self._send('POST', endpoints.logout(), data=payload, timeout=self.request_timeout)
         self.session.headers['Authorization'] = None
         self.auth_token = None
+        self.token_expires_at = None
+        self.stop_token_refresh()
+        self.stop_keepalive()
+        if self.credential_store:
+            self.credential_store.clear()
         res.raise_for_status()
         return res
 
-    def _req_get(self, *args, timeout=15, asjson=True, **kwargs):
-        res = self.session.get(*args, timeout=timeout, **kwargs)
+    def __setstate__(self, state):
+        Picklable.__setstate__(self, state)
+        if self.auto_refresh_token and self.token_expires_at:
+            self.start_token_refresh()
+
+    def _send(self, method, url, **kwargs):
+        """Sends a request through the rate limiter, retrying 429 responses after their Retry-After delay.
+            An expired access token is renewed first, a 401 response is retried once after a renewal.
+            GETs of the endpoints cached by `response_cache` may be answered from memory"""
+        cache = self.response_cache
+        if cache is not None and method == 'GET':
+            return cache.request(url, kwargs, lambda **kwargs: self._send_uncached(method, url, **kwargs))
+        return self._send_uncached(method, url, **kwargs)
+
+    def _send_uncached(self, method, url, **kwargs):
+        limiter = self.rate_limiter
+        attempt = 0
+        renewable = self.refresh_token and url not in (endpoints.login(), endpoints.logout())
+        if renewable and self.token_expires_at and self.token_expires_at <= time.time():
+            self._renew_token(self.token_expires_at)
+        while True:
+            if limiter:
+                limiter.acquire(url, method)
+            expires_at = self.token_expires_at
+            res = self._request(method, url, **kwargs)
+            if res.status_code == 401 and renewable:
+                renewable = False
+                self._renew_token(expires_at)
+                continue
+            if res.status_code != 429 or not limiter or attempt >= limiter.max_retries:
+                return res
+            limiter.retry_after(url, res.headers.get('Retry-After'), method)
+            attempt += 1
+
+    def _request(self, method, url, **kwargs):
+        metrics, tracer = self.metrics, self.tracer
+        if not metrics and not tracer:
+            return (self.transport or self.session).request(method, url, **kwargs)
+
+        span = tracer.start(method + ' ' + endpoint_template(url), 'request', url=url) if tracer else None
+        started = time.perf_counter()
+        try:
+            res = (self.transport or self.session).request(method, url, **kwargs)
+        except Exception as e:
+            if metrics:
+                metrics.observe(method, url, None, time.perf_counter() - started, kwargs, error=e)
+            if span:
+                span.end(error=e)
+            raise
+        if metrics:
+            metrics.observe(method, url, res, time.perf_counter() - started, kwargs)
+        if span:
+            span.end(status=res.status_code)
+        return res
+
+    def _req_get(self, url, timeout=15, asjson=True, **kwargs):
+        res = self._send('GET', url, timeout=timeout, **kwargs)
 
         if not res:
             print(res.text)
             res.raise_for_status()
         return res.json() if asjson else res
 
-    def _req_post(self, *args, timeout=15, asjson=True, **kwargs):
+    def _req_post(self, url, timeout=15, asjson=True, **kwargs):
         """Should be used for api calls only (not login)"""
-        self.session.headers['Content-Type'] = 'application/json'
-        self.session.headers['Accept'] = '*/*'
-        self.session.headers['Sec-Fetch-Site'] = 'same-site'
-        self.session.headers['Sec-Fetch-Mode'] = 'cors'
-        self.session.headers['Accept-Encoding'] = 'gzip, deflate, br'
-        self.session.headers['Accept-Language'] = 'en-US,en;q=0.9'
-        res = self.session.post(*args, timeout=timeout, **kwargs)
+        # per request headers, concurrent posts must not modify the shared session headers
+        res = self._send('POST', url, timeout=timeout, headers=self._post_headers, **kwargs)
         if not res:
             print(res.text)
             if 'data' in kwargs:
@@ -140,6 +383,13 @@ class Trader:
             res.raise_for_status()
         return res.json() if asjson else res
 
+    def _req_get_pages(self, url, **kwargs):
+        """Yields the 'results' of each page, following the 'next' links"""
+        while url:
+            json = self._req_get(url, **kwargs)
+            yield json['results']
+            url = json.get('next')
+
     ###########################################################################
     #                               GET CRYPTO FUNCTIONS
     ###########################################################################
@@ -147,6 +397,68 @@ class Trader:
     def crypto(self):
         return self._crypto_trader
 
+    ###########################################################################
+    #                               CONNECTIONS
+    ###########################################################################
+
+    def warmup(self, connections=1):
+        """Opens `connections` pooled connections to api.robinhood.com and nummus.robinhood.com
+            (dns, tcp and tls setup) with cheap requests, so the next calls skip the handshakes.
+            Returns {host_url: seconds} of the slowest request to each host"""
+        hosts = [endpoints.api_url + '/', crypto_endpoints.crypto_base_url]
+
+        def ping(url):
+            started = time.perf_counter()
+            try:
+                self._send('HEAD', url, timeout=self.request_timeout, allow_redirects=False)
+            except Exception:
+                pass  # warming up must never fail the caller
+            return url, time.perf_counter() - started
+
+        seconds = {}
+        for url, elapsed in concurrent_map(ping, hosts * connections, self.max_workers):
+            seconds[url] = max(seconds.get(url, 0.0), elapsed)
+        return seconds
+
+    def start_keepalive(self, interval=None, connections=1):
+        """Keeps the pooled connections hot with a `warmup` every `interval` seconds
+            (`keepalive_interval` by default) from a background thread"""
+        self.stop_keepalive()
+        stop = threading.Event()
+        thread = threading.Thread(target=self._keepalive_loop, args=(stop, interval or self.keepalive_interval, connections),
+                                  name='robinhood-keepalive', daemon=True)
+        self._keepalive = (thread, stop)
+        thread.start()
+
+    def stop_keepalive(self):
+        if self._keepalive:
+            self._keepalive[1].set()
+            self._keepalive = None
+
+    def _keepalive_loop(self, stop, interval, connections):
+        self.warmup(connections)
+        while not stop.wait(interval):
+            self.warmup(connections)
+
+    ###########################################################################
+    #                               MARKET HOURS
+    ###########################################################################
+
+    @property
+    def market_calendar(self):
+        """`MarketCalendar` of the NYSE, hours are cached for `metadata_ttl` seconds"""
+        if self._market_calendar is None:
+            self._market_calendar = MarketCalendar(self, ttl=self.metadata_ttl)
+        return self._market_calendar
+
+    def market_hours(self, date=None):
+        """Hours json of a date ('yyyy-mm-dd', today by default), see `MarketCalendar.hours`"""
+        return self.market_calendar.hours(date)
+
+    def is_market_open(self, extended=False):
+        """True if the regular (or extended) session is open"""
+        return self.market_calendar.is_open(extended=extended)
+
     ###########################################################################
     #                        SAVING AND LOADING SESSIONS
     ###########################################################################
@@ -171,17 +483,78 @@ class Trader:
         """Fetch fundamentals info"""
         return self._req_get(endpoints.fundamentals(symbol.upper()))
 
+    def fundamentals_many(self, symbols):
+        """Fetch fundamentals for many symbols as a typed DataFrame indexed by symbol,
+            batched `fundamentals_batch_size` per request, cached for `fundamentals_ttl` seconds"""
+        return _fundamentals_many(self, symbols)
+
     def instrument(self, symbol):
-        """Fetch instrument info"""
-        url = str(endpoints.instruments()) + "?symbol=" + str(symbol)
-        results = self._req_get(url)['results'][0]
-        return results if results else Exception(f"Invalid symbol: {symbol}")
+        """Fetch instrument info, cached for `metadata_ttl` seconds"""
+        return self._instrument_cache.get_or_fetch(symbol.upper(), self._fetch_instrument)
 
-    def quote(self, symbol):
-        """Fetch stock quote"""
+    def _fetch_instrument(self, symbol):
+        if self._invalid_symbols.get(symbol):
+            raise Exception(f"Invalid symbol: {symbol}")
+        url = str(endpoints.instruments()) + "?symbol=" + str(symbol)
+        results = self._req_get(url)['results']
+        if not results:
+            self._invalid_symbols.set(symbol, True)
+            raise Exception(f"Invalid symbol: {symbol}")
+        self._instrument_cache.set(results[0]['url'], results[0])
+        return results[0]
+
+    def instruments_by_symbol(self, symbols):
+        """Fetch instruments of many symbols, returns {symbol: instrument}.
+            Results are cached, missing symbols are fetched concurrently"""
+        symbols = [symbol.upper() for symbol in symbols]
+        return self._instrument_cache.get_many(symbols, self._fetch_instrument, self.max_workers)
+
+    def instruments(self, urls):
+        """Fetch instruments from their urls, returns {url: instrument}.
+            Results are cached, missing urls are fetched concurrently"""
+        return self._instrument_cache.get_many(urls, self._req_get, self.max_workers)
+
+    def tag_symbols(self, tag):
+        """Symbols of a robinhood tag (ex: '100-most-popular')"""
+        return list(self.universe(tags=[tag])['symbol'])
+
+    def watchlist_symbols(self, name=None):
+        """Symbols of a watchlist (every watchlist if name is None)"""
+        return list(self.universe(watchlists=[name] if name else True)['symbol'])
+
+    def universe(self, tags=None, watchlists=None, symbols=None, quotes=False):
+        """DataFrame of the instruments of tags/watchlists, indexed by symbol.
+            instruments are resolved through the instrument cache (concurrently),
+            quotes=True attaches a batched quote snapshot"""
+        return _universe.universe(self, tags, watchlists, symbols, quotes)
+
+    def quote(self, symbol, max_staleness=None):
+        """Fetch stock quote
+            max_staleness: seconds, a cached quote at most this old is returned without a request"""
         symbol = symbol.upper()
-        url = str(endpoints.quotes()) + f"?symbols={symbol}"
-        return Quote(self._req_get(url)['results'][0])
+        quote = self._quote_cache.fresh(symbol, max_staleness)
+        if quote is None:
+            url = str(endpoints.quotes()) + f"?symbols={symbol}"
+            quote = self._quote_cache.put(symbol, Quote(self._req_get(url)['results'][0]))
+        return quote
+
+    def quotes(self, symbols, max_staleness=None):
+        """Fetch stock quotes for many symbols, `quote_batch_size` symbols per request.
+            Returns a list aligned with `symbols` (None for unknown symbols)
+            max_staleness: seconds, cached quotes at most this old are not requested again"""
+        def fetch(batch):
+            url = str(endpoints.quotes()) + "?symbols=" + ",".join(batch)
+            quotes = [Quote(quote) if quote else None for quote in self._req_get(url)['results']]
+            return [self._quote_cache.put(symbol, quote) if quote else None for symbol, quote in zip(batch, quotes)]
+
+        symbols = [symbol.upper() for symbol in symbols]
+        quotes = {symbol: self._quote_cache.fresh(symbol, max_staleness) for symbol in symbols}
+        missing = [symbol for symbol, quote in quotes.items() if quote is None]
+
+        batches = _chunks(missing, self.quote_batch_size)
+        for batch, results in zip(batches, concurrent_map(fetch, batches, self.max_workers)):
+            quotes.update(zip(batch, results))
+        return [quotes[symbol] for symbol in symbols]
 
     def orderbook(self, symbol):
         """Returns the orderbook json, only valid for gold users, not supported for crypto"""
@@ -190,13 +563,12 @@ class Trader:
         return self._req_get(endpoints.orderbook(instrument_id))
 
     def watch_orderbook(self, symbol, tick_duration=1, book_view_size=15):
-        from ...common import _get_console_color, _set_console_color
-        import time
+        """Prints the orderbook every `tick_duration` seconds, idles while the market is closed"""
+        colors = {'green': '\033[32m', 'red': '\033[31m', 'white': '\033[0m'}
 
         def view_book_string(bookhalf, color):
-            s = _get_console_color(color)
+            s = colors[color]
             for record in bookhalf:
-                print(record)
                 s += record['price']['amount'] + f' {record["quantity"]}\n'
             return s
 
@@ -205,14 +577,36 @@ class Trader:
                 return bk[0:book_view_size]
             return bk
 
-        while True:
-            book = self.orderbook(symbol)
+        for book in _poll(lambda: self.orderbook(symbol), tick_duration, self.market_calendar, extended=True):
             book_str = '\033c'
             book_str += view_book_string(reversed(truncate(book['asks'])), 'green')
             book_str += view_book_string(truncate(book['bids']), 'red')
-            print(book_str)
-            _set_console_color('white')
-            time.sleep(tick_duration)
+            print(book_str + colors['white'])
+
+    def stream_quotes(self, symbols, interval=1.0, extended=False):
+        """Yields `quotes(symbols)` every `interval` seconds, forever.
+            While the market is closed (regular session, or extended=True for the extended one)
+            it sleeps until the next open instead of polling"""
+        yield from _poll(lambda: self.quotes(symbols), interval, self.market_calendar, extended)
+
+    def option_chain(self, symbol):
+        """Fetch the options chain info (id, expiration_dates ...), cached"""
+        return _options.chain(self, symbol)
+
+    def option_instruments(self, symbol, expiration_dates=None, option_type=None):
+        """Fetch option instruments of a chain, cached
+            expiration_dates: list of 'yyyy-mm-dd' dates, defaults to every expiration
+            option_type: 'call' or 'put', defaults to both"""
+        return _options.instruments(self, symbol, expiration_dates, option_type)
+
+    def option_market_data(self, instrument_urls):
+        """Fetch option market data for many contracts in batches, returns {instrument_url: json}"""
+        return _options.market_data(self, instrument_urls)
+
+    def options_frame(self, symbol, expiration_dates=None, option_type=None):
+        """Returns the options chain as a typed DataFrame
+            (strike, expiration_date, type, bid, ask, implied_volatility, greeks ...)"""
+        return _options.options_frame(self, symbol, expiration_dates, option_type)
 
     def historical_quotes(self,
                           symbol,
@@ -270,17 +664,39 @@ class Trader:
         orders = self._req_get(endpoints.orders())['results']
         return [Order(self, order, False) for order in orders]
 
+    def orders_frame(self):
+        """Returns every order (all pages) as a typed DataFrame,
+            orders with executions produce one row per execution"""
+        buffer = ColumnBuffer(Order.frame_columns, Order.frame_executions)
+        for page in self._req_get_pages(endpoints.orders()):
+            buffer.extend(page)
+        return buffer.to_frame()
+
+    def crypto_orders_frame(self):
+        """Returns every crypto order (all pages) as a typed DataFrame"""
+        return self.crypto.orders_frame()
+
     def order(self, order:[dict, str]):
         order_id = order['id'] if isinstance(order, dict) else order
         json = self._req_get(endpoints.orders() + order_id)
         return Order(self, json, False)
 
     def dividends(self):
-        return self._req_get(endpoints.orders())
+        return self._req_get(endpoints.dividends())
+
+    def dividends_frame(self, path=None):
+        """Returns every dividend (all pages) as a typed DataFrame.
+            If `path` is supplied the records are stored in that json file,
+            and later calls only fetch the records that are new"""
+        return _dividends_frame(self, path)
 
     def positions(self):
         return self._req_get(endpoints.positions())
 
+    def portfolio_snapshot(self, nonzero=True):
+        """Returns a valued PortfolioSnapshot of every position (see `PortfolioSnapshot`)"""
+        return PortfolioSnapshot(self, nonzero=nonzero)
+
     ###########################################################################
     #                               PLACE ORDER
     ###########################################################################
@@ -292,7 +708,8 @@ class Trader:
             trailing_stop_percent=None,
             trailing_stop_amount=None,
             time_in_force=None,
-            extended_hours=None):
+            extended_hours=None,
+            quote=None):
         """
         Args:
             symbol: the stock symbol
@@ -300,6 +717,7 @@ class Trader:
             price: the limit price, if None defaults to a market order
             stop_price: the stop-loss price, if None defaults to an immediate (regular) order
             time_in_force: 'gfd' or 'gtc', gfd: cancel end of day, gtc: cancel until specified
+            quote: a Quote already held, used instead of fetching one to price the order
 
         Returns: Order object
         """
@@ -311,7 +729,8 @@ class Trader:
                                 trailing_stop_percent=trailing_stop_percent,
                                 trailing_stop_amount=trailing_stop_amount,
                                 time_in_force=time_in_force,
-                                extended_hours=extended_hours)
+                                extended_hours=extended_hours,
+                                quote=quote)
 
     def sell(self,
              symbol,
@@ -321,7 +740,8 @@ class Trader:
              trailing_stop_percent=None,
              trailing_stop_amount=None,
              time_in_force=None,
-             extended_hours=None):
+             extended_hours=None,
+             quote=None):
         """
         Args:
             symbol: the stock symbol
@@ -329,6 +749,7 @@ class Trader:
             price: the limit price, if None defaults to a market order
             stop_price: the stop-loss price, if None defaults to an immediate (regular) order
             time_in_force: 'gfd' or 'gtc', gfd: cancel end of day, gtc: cancel until specified
+            quote: a Quote already held, used instead of fetching one to price the order
 
         Returns: (Order Object) (non-mutable dict)
         {
@@ -360,13 +781,11 @@ class Trader:
                                 trailing_stop_percent=trailing_stop_percent,
                                 trailing_stop_amount=trailing_stop_amount,
                                 time_in_force=time_in_force,
-                                extended_hours=extended_hours)
+                                extended_hours=extended_hours,
+                                quote=quote)
 
-    def _fprice(self, value):
-        if not value:
-            return value
-        else:
-            return "{0:.2f}".format(round(float(value), 2))
+    def _fprice(self, value, tick=0.01):
+        return format_price(value, tick)
 
     def place_order(self,
                     symbol,
@@ -377,7 +796,8 @@ class Trader:
                     trailing_stop_amount,
                     side,
                     time_in_force,
-                    extended_hours):
+                    extended_hours,
+                    quote=None):
 
         """
         Args:
@@ -386,6 +806,7 @@ class Trader:
             price: the limit price, if None defaults to a market order
             stop_price: the stop-loss price, if None defaults to an immediate (regular) order
             time_in_force: 'gfd' or 'gtc', gfd: cancel end of day, gtc: cancel until specified
+            quote: a Quote already held, if None a quote at most `quote_staleness` seconds old is used
 
         Returns:
             (Order Object) (non-mutable dict)
@@ -412,6 +833,69 @@ class Trader:
                "updated_at":"2020-03-31T16:27:40.866278-04:00"
             }
         """
+        payload = self._order_payload(instrument=self.instrument(symbol),
+                                      quote=quote,
+                                      quantity=quantity,
+                                      price=price,
+                                      stop_price=stop_price,
+                                      trailing_stop_percent=trailing_stop_percent,
+                                      trailing_stop_amount=trailing_stop_amount,
+                                      side=side,
+                                      time_in_force=time_in_force,
+                                      extended_hours=extended_hours)
+        return Order(self, self._submit_order(payload, endpoints.orders()))
+
+    def _submit_order(self, payload, orders_url):
+        """
+        Posts an order payload (which must contain a 'ref_id'). If the request times out, the recent
+        orders are searched for that ref_id twice, `order_lookup_delay` seconds apart, and the order
+        is resubmitted only if neither lookup finds it. This makes doubled orders unlikely, but a
+        submission still in flight after both lookups can not be ruled out.
+        """
+        submitted = _updated_since()
+        data = dumps(payload)
+        for attempt in range(self.order_retries + 1):
+            try:
+                return self._req_post(orders_url, data=data, timeout=self.order_timeout)
+            except requests.exceptions.Timeout:
+                if attempt == self.order_retries:
+                    raise
+            for lookup in range(2):
+                # the timed out request may still be processed, give it time to land
+                time.sleep(self.order_lookup_delay)
+                existing = self._find_order(orders_url, payload['ref_id'], submitted)
+                if existing:
+                    return existing
+
+    def _find_order(self, orders_url, ref_id, updated_since):
+        """Returns the json of the order with `ref_id` updated since `updated_since`, or None"""
+        url = orders_url + '?updated_at[gte]=' + updated_since
+        for page in self._req_get_pages(url):
+            for order in page:
+                if order.get('ref_id') == ref_id:
+                    return order
+        return None
+
+    @staticmethod
+    def _order_needs_quote(price, trailing_stop_percent=None, trailing_stop_amount=None):
+        is_trailing_stop = any([trailing_stop_percent, trailing_stop_amount])
+        return is_trailing_stop or not price
+
+    def _order_payload(self,
+                       instrument,
+                       quantity,
+                       quote=None,
+                       account_url=None,
+                       price=None,
+                       stop_price=None,
+                       trailing_stop_percent=None,
+                       trailing_stop_amount=None,
+                       side=None,
+                       time_in_force=None,
+                       extended_hours=None,
+                       validated=False):
+        """Builds the order payload from an already resolved instrument. The order is validated
+            (unless `validated`, prices already rounded) before the missing quote and account are fetched"""
         if not time_in_force: time_in_force = 'gfd'
         assert (side in ['buy', 'sell'])
         assert (time_in_force in ['gfd', 'gtc'])
@@ -426,17 +910,22 @@ class Trader:
         if is_trailing_stop and price:
             raise Exception("Trailing stop orders and `limit` are not compatible")
 
+        if not validated:
+            price, stop_price = validate_order(instrument, quantity, price, stop_price)
+        if not quote and self._order_needs_quote(price, trailing_stop_percent, trailing_stop_amount):
+            quote = self.quote(instrument['symbol'], max_staleness=self.quote_staleness)
+        account_url = account_url or self.account()["url"]
+
         is_stop = stop_price or is_trailing_stop
         trigger = 'stop' if is_stop else 'immediate'
         order = 'limit' if price else 'market'
-        symbol = symbol.upper()
-        instrument = self.instrument(symbol)
 
         if not (is_trailing_stop and side == 'sell') and not price:
-            price = self._fprice(self.quote(instrument['symbol']).last_trade_price)
+            price = self._fprice(quote.mark, tick_size(instrument, quote.mark))
 
         payload = {
-            "account": self.account()["url"],
+            "ref_id": str(uuid.uuid4()),
+            "account": account_url,
             "instrument": unquote(instrument["url"]),
             "symbol": instrument["symbol"],
             "quantity": quantity,
@@ -450,7 +939,7 @@ class Trader:
         }
 
         if trailing_stop_amount or trailing_stop_percent:
-            quote = self.quote(instrument['symbol']).mark
+            mark = quote.mark
 
             if trailing_stop_amount:
                 trailing_peg = {
@@ -462,8 +951,8 @@ class Trader:
                 }
 
                 modifier = 1 if side == 'sell' else -1
-                stop_price = quote + trailing_stop_amount * modifier
-                payload['stop_price'] = self._fprice(stop_price)
+                stop_price = mark + trailing_stop_amount * modifier
+                payload['stop_price'] = self._fprice(stop_price, tick_size(instrument, stop_price))
             else:
                 if not isinstance(trailing_stop_percent, int):
                     raise Exception("trailing stop percent must be int")
@@ -475,14 +964,93 @@ class Trader:
 
                 trailing_stop_ratio = trailing_stop_percent/100
                 if side == 'sell': trailing_stop_ratio += 1
-                payload['stop_price'] = self._fprice(quote * trailing_stop_ratio)
+                stop_price = mark * trailing_stop_ratio
+                payload['stop_price'] = self._fprice(stop_price, tick_size(instrument, stop_price))
 
             payload['trailing_peg'] = trailing_peg
 
-        payload = {k: v for k, v in payload.items() if v}
-        payload = dumps(payload)
-        json = self._req_post(endpoints.orders(), data=payload)
-        return Order(self, json)
+        return {k: v for k, v in payload.items() if v}
+
+    def validate_orders(self, orders):
+        """
+        Validates and normalizes a batch of orders locally, in one vectorized pass,
+        from the (cached) instruments' tradability, tick size and fractional support.
+
+        Args:
+            orders: DataFrame or list of dicts with 'symbol', 'quantity' and optional 'price', 'stop_price'
+
+        Returns:
+            DataFrame with prices rounded to each instrument's tick and an 'error' column (null if valid)
+        """
+        symbols = list(dict.fromkeys(order['symbol'].upper() for order in _records(orders)))
+
+        def resolve(symbol):
+            try:
+                return self.instrument(symbol)
+            except Exception:
+                return None
+
+        instruments = dict(zip(symbols, concurrent_map(resolve, symbols, self.max_workers)))
+        return validate_orders(orders, {k: v for k, v in instruments.items() if v})
+
+    def place_orders(self, orders, max_concurrency=None):
+        """
+        Place many orders at once, the account, instruments and quotes are resolved
+        once for the whole batch and orders are submitted concurrently.
+
+        Args:
+            orders: list of dicts of `buy`/`sell` arguments with a 'side' key
+                (a 'quote' key may supply a Quote already held)
+                ex: [{'symbol': 'aapl', 'quantity': 1, 'side': 'buy'},
+                     {'symbol': 'msft', 'quantity': 2, 'side': 'sell', 'price': 180.0}]
+            max_concurrency: max orders in flight, defaults to `max_workers`
+
+        Returns:
+            list aligned with `orders`, each element is an Order, or the Exception raised by that order
+        """
+        def resolve(symbol):
+            try:
+                return self.instrument(symbol)
+            except Exception as e:
+                return e
+
+        def check(spec):
+            instrument = instruments[spec['symbol']]
+            if isinstance(instrument, Exception):
+                return instrument
+            try:
+                spec['price'], spec['stop_price'] = validate_order(instrument, spec['quantity'],
+                                                                   spec.get('price'), spec.get('stop_price'))
+            except Exception as e:
+                return e
+
+        specs = [dict(spec, symbol=spec['symbol'].upper()) for spec in orders]
+        symbols = list(dict.fromkeys(spec['symbol'] for spec in specs))
+        account_url = self.account()["url"]
+        instruments = dict(zip(symbols, concurrent_map(resolve, symbols, self.max_workers)))
+        # invalid orders are not quoted nor submitted
+        errors = [check(spec) for spec in specs]
+
+        quoted = list(dict.fromkeys(
+            spec['symbol'] for spec, error in zip(specs, errors) if not error and not spec.get('quote')
+            and self._order_needs_quote(spec.get('price'), spec.get('trailing_stop_percent'), spec.get('trailing_stop_amount'))))
+        quotes = dict(zip(quoted, self.quotes(quoted, max_staleness=self.quote_staleness)))
+
+        def submit(spec, error):
+            try:
+                if error:
+                    raise error
+                instrument = instruments[spec['symbol']]
+                payload = self._order_payload(instrument=instrument,
+                                              quote=spec.get('quote') or quotes.get(spec['symbol']),
+                                              account_url=account_url,
+                                              validated=True,
+                                              **{k: v for k, v in spec.items() if k not in ['symbol', 'quote']})
+                return Order(self, self._submit_order(payload, endpoints.orders()))
+            except Exception as e:
+                return e
+
+        return concurrent_map(lambda args: submit(*args), zip(specs, errors), max_concurrency or self.max_workers)
 
     ###########################################################################
     #                               CANCEL ORDER
@@ -496,3 +1064,60 @@ class Trader:
         else:
             raise Exception("Neither, 'cancel' nor 'cancel_url' were found")
         return self._req_post(cancel_url, asjson=False)
+
+    def open_orders(self):
+        """Every order that is not filled, canceled, rejected or failed (all pages)"""
+        return [Order(self, order, False)
+                for page in self._req_get_pages(endpoints.orders())
+                for order in page if order['state'] not in final_states]
+
+    def watch_orders(self, orders, interval=5, timeout=None):
+        """Yields each order once it is filled, canceled, rejected or failed, the open ones are
+            updated every `interval` seconds (for at most `timeout` seconds).
+            Polling pauses while the market (extended hours included) is closed"""
+        yield from _watch_orders(orders, interval, self.market_calendar, True, timeout, self.max_workers)
+
+    def cancel_many(self, orders, max_concurrency=None):
+        """
+        Cancel many orders concurrently, then confirm their states with a single
+        listing of the orders updated since the cancels were sent.
+
+        Returns:
+            list aligned with `orders`, the (updated) Order, or the Exception raised by its cancel
+        """
+        return self._cancel_many(orders, endpoints.orders(), max_concurrency)
+
+    def cancel_all(self, filter=None, max_concurrency=None):
+        """
+        Cancel every open order, `filter(order) -> bool` selects the orders to cancel.
+        Ex: trader.cancel_all(lambda order: order.side == 'buy')
+        """
+        orders = [order for order in self.open_orders() if not filter or filter(order)]
+        return self.cancel_many(orders, max_concurrency)
+
+    def _cancel_many(self, orders, orders_url, max_concurrency=None):
+        def cancel(order):
+            try:
+                self.cancel(order)
+                return order
+            except Exception as e:
+                return e
+
+        orders = list(orders)
+        if not orders:
+            return []
+
+        started = _updated_since()
+        results = concurrent_map(cancel, orders, max_concurrency or self.max_workers)
+
+        url = orders_url + '?updated_at[gte]=' + started
+        updated = {order['id']: order for page in self._req_get_pages(url) for order in page}
+
+        for order in results:
+            if isinstance(order, Exception) or order['id'] not in updated:
+                continue
+            update_dict = updated[order['id']]
+            if 'time' in order:
+                update_dict['time'] = order.time
+            order._dict = update_dict
+        return results
@@ -0,0 +1,316 @@
+"""
+Pluggable transports under `Trader._req_get`/`_req_post`.
+
+A transport is any object with `request(method, url, **kwargs) -> response`
+(a `requests.Session` is one). Set `trader.transport` to route every request through it:
+
+	# record a live session (credentials scrubbed)
+	trader.transport = RecordingTransport(trader.session)
+	...
+	trader.transport.save('session.jsonl')
+
+	# replay it offline, with a deterministic simulated latency
+	trader = Trader()
+	trader.transport = ReplayTransport('session.jsonl', latency=0.05)
+
+	# multiplex concurrent requests over HTTP/2 (needs `httpx[http2]`, else HTTP/1.1)
+	trader.transport = Http2Transport(trader.session)
+"""
+from collections import defaultdict, deque
+from urllib.parse import urlsplit, parse_qsl, urlencode
+from json import dumps, loads
+import threading
+import time
+
+from .detail.common import Picklable
+
+# payload and response fields never written to a recording
+secret_keys = {'username', 'password', 'access_token', 'refresh_token', 'mfa_code', 'device_token', 'token', 'client_id'}
+
+# query parameters and payload fields that change between runs (time stamps, client ids),
+# they are ignored when a replayed request is matched to a recording
+volatile_query = {'updated_at[gte]'}
+volatile_body = {'ref_id'}
+
+scrubbed = '***'
+
+
+class Response:
+	"""Minimal stand-in for `requests.Response`"""
+
+	def __init__(self, body, status_code=200, headers=None, text=None):
+		self._body = body
+		self.status_code = status_code
+		self.headers = headers or {}
+		self._text = text
+
+	def __bool__(self):
+		return self.status_code < 400
+
+	@property
+	def ok(self):
+		return bool(self)
+
+	@property
+	def text(self):
+		if self._text is None:
+			self._text = dumps(self._body) if self._body is not None else ''
+		return self._text
+
+	@property
+	def content(self):
+		return self.text.encode()
+
+	def json(self):
+		if self._body is None:
+			if self._text:
+				return loads(self._text)
+			raise ValueError("response has no json body")
+		return self._body
+
+	def raise_for_status(self):
+		if not self:
+			raise Exception(f"{self.status_code}: {self.text}")
+
+
+def scrub(value):
+	"""Replaces every secret (see `secret_keys`) of a json value"""
+	if isinstance(value, dict):
+		return {k: scrubbed if k in secret_keys and v else scrub(v) for k, v in value.items()}
+	if isinstance(value, list):
+		return [scrub(v) for v in value]
+	return value
+
+
+def _body(data, json=None):
+	"""Request body as a json value (payloads are either json strings or form dicts)"""
+	if json is not None:
+		return json
+	if isinstance(data, bytes):
+		data = data.decode()
+	if isinstance(data, str):
+		try:
+			return loads(data)
+		except ValueError:
+			return data
+	if isinstance(data, dict):
+		return dict(data)
+	return data
+
+
+def request_key(method, url, body=None, params=None):
+	"""Key matching a request to its recording, volatile values are ignored"""
+	parts = urlsplit(url)
+	query = parse_qsl(parts.query, keep_blank_values=True) + list((params or {}).items())
+	query = sorted((k, '' if k in volatile_query else str(v)) for k, v in query)
+	key_url = parts.scheme + '://' + parts.netloc + parts.path + ('?' + urlencode(query) if query else '')
+
+	if isinstance(body, dict):
+		body = {k: v for k, v in body.items() if k not in volatile_body and k not in secret_keys}
+	return method.upper(), key_url, dumps(body, sort_keys=True, default=str) if body is not None else None
+
+
+class RecordingTransport(Picklable):
+	"""
+	Forwards requests to `inner` (a requests.Session or another transport) and records
+	scrubbed request/response pairs.
+	"""
+
+	def __init__(self, inner, path=None):
+		self.inner = inner
+		self.path = path
+		self.records = []
+		self._lock = threading.Lock()
+
+	def request(self, method, url, data=None, json=None, params=None, **kwargs):
+		started = time.perf_counter()
+		res = self.inner.request(method, url, data=data, json=json, params=params, **kwargs)
+		elapsed = time.perf_counter() - started
+
+		try:
+			response = res.json()
+		except ValueError:
+			response = None
+		record = {
+			'method': method.upper(),
+			'url': url,
+			'params': params,
+			'body': scrub(_body(data, json)),
+			'status': res.status_code,
+			'headers': {k: v for k, v in res.headers.items() if k.lower() in ('retry-after', 'content-type')},
+			'response': scrub(response),
+			'text': None if response is not None else res.text,
+			'elapsed': elapsed,
+		}
+		with self._lock:
+			self.records.append(record)
+		return res
+
+	def save(self, path=None):
+		"""Writes the recording as json lines"""
+		with open(path or self.path, 'w') as file:
+			for record in self.records:
+				file.write(dumps(record, default=str) + '\n')
+
+
+def load_records(path):
+	with open(path, 'r') as file:
+		return [loads(line) for line in file if line.strip()]
+
+
+class ReplayTransport(Picklable):
+	"""
+	Serves recorded responses from an in-memory index, without any network access.
+
+	Requests are matched on method, url (query order and volatile values ignored) and body,
+	falling back on method and url alone. Repeated requests replay the recorded responses in order,
+	the last one is repeated once they run out.
+
+	Args:
+		records: path of a recording, or a list of records
+		latency: simulated seconds per request, a number or `latency(method, url) -> seconds`,
+			'recorded' replays each record's measured latency
+		strict: if True, unknown requests raise KeyError, else they get a 404 response
+	"""
+
+	def __init__(self, records, latency=0.0, strict=True):
+		if isinstance(records, str):
+			records = load_records(records)
+		self.latency = latency
+		self.strict = strict
+		self.requests = []
+		self._lock = threading.Lock()
+		self._exact = defaultdict(deque)
+		self._loose = defaultdict(deque)
+		for record in records:
+			self.add(record)
+
+	def add(self, record):
+		"""Adds a record ({'method', 'url', 'body', 'status', 'response', ...}) to the index"""
+		method, url, body = request_key(record['method'], record['url'], record.get('body'), record.get('params'))
+		self._exact[(method, url, body)].append(record)
+		self._loose[(method, url)].append(record)
+
+	def _next(self, queue):
+		return queue.popleft() if len(queue) > 1 else queue[0]
+
+	def request(self, method, url, data=None, json=None, params=None, **kwargs):
+		method, key_url, body = request_key(method, url, _body(data, json), params)
+		with self._lock:
+			self.requests.append((method, url))
+			queue = self._exact.get((method, key_url, body)) or self._loose.get((method, key_url))
+			record = self._next(queue) if queue else None
+
+		if record is None:
+			if self.strict:
+				raise KeyError(f"no recording for {method} {url}")
+			return Response({'detail': 'Not found.'}, 404)
+
+		latency = self.latency
+		if latency == 'recorded':
+			latency = record.get('elapsed', 0.0)
+		elif callable(latency):
+			latency = latency(method, url)
+		if latency:
+			time.sleep(latency)
+
+		return Response(record.get('response'), record.get('status', 200), dict(record.get('headers') or {}), record.get('text'))
+
+	def get(self, url, **kwargs):
+		return self.request('GET', url, **kwargs)
+
+	def post(self, url, **kwargs):
+		return self.request('POST', url, **kwargs)
+
+
+class _HttpxResponse(Response):
+	"""`requests.Response`-like view of an httpx response"""
+
+	def __init__(self, res):
+		Response.__init__(self, None, res.status_code, res.headers)
+		self.http_version = res.http_version
+		self._response = res
+
+	@property
+	def text(self):
+		return self._response.text
+
+	@property
+	def content(self):
+		return self._response.content
+
+	def json(self):
+		return self._response.json()
+
+	def raise_for_status(self):
+		if not self:
+			import requests
+			raise requests.exceptions.HTTPError(f"{self.status_code} Error: {self.text} for url: {self._response.url}",
+												response=self)
+
+
+# hop-by-hop headers, not allowed in HTTP/2 requests
+_connection_headers = {'connection', 'keep-alive', 'proxy-connection', 'transfer-encoding', 'upgrade'}
+
+
+class Http2Transport(Picklable):
+	"""
+	Multiplexes concurrent requests over a single HTTP/2 connection per host with httpx
+	(`pip install httpx[http2]`). Without httpx, or for servers that only speak HTTP/1.1
+	(negotiated per connection), requests go over HTTP/1.1.
+
+	Args:
+		session: the Trader's requests session, its headers (authorization ...) are sent with every
+			request and it is the HTTP/1.1 fallback when httpx is not installed
+		http1: False to require HTTP/2, also enables cleartext HTTP/2 (h2c) for http:// urls
+		max_connections: connection pool size of the httpx client
+	"""
+	_unpickled = {'client': lambda self: self._client()}
+
+	def __init__(self, session, http1=True, max_connections=10):
+		self.session = session
+		self.http1 = http1
+		self.max_connections = max_connections
+		self.client = self._client()
+
+	def _client(self):
+		try:
+			import httpx
+			return httpx.Client(http1=self.http1, http2=True, limits=httpx.Limits(max_connections=self.max_connections))
+		except ImportError:
+			# httpx, or its h2 extra, is not installed
+			return None
+
+	@property
+	def http2(self) -> bool:
+		"""True if requests are sent with httpx (HTTP/2 where the server supports it)"""
+		return self.client is not None
+
+	def close(self):
+		if self.client is not None:
+			self.client.close()
+
+	def request(self, method, url, data=None, json=None, params=None, headers=None, timeout=None,
+				allow_redirects=True, **kwargs):
+		if self.client is None:
+			return self.session.request(method, url, data=data, json=json, params=params, headers=headers,
+										timeout=timeout, allow_redirects=allow_redirects, **kwargs)
+		import httpx
+		import requests
+
+		# requests only options (verify, stream, proxies ...) keep httpx's defaults
+		merged = {k: v for k, v in dict(self.session.headers, **(headers or {})).items()
+				  if v is not None and k.lower() not in _connection_headers}
+		# brotli needs an extra package on the httpx side
+		merged['Accept-Encoding'] = 'gzip, deflate'
+		body = {'content': data} if isinstance(data, (str, bytes)) else {'data': data}
+
+		try:
+			res = self.client.request(method, url, json=json, params=params, headers=merged, timeout=timeout,
+									  follow_redirects=allow_redirects, **body)
+		except httpx.TimeoutException as e:
+			# callers handle requests' exceptions (ex: order submissions retried on Timeout)
+			raise requests.exceptions.Timeout(str(e))
+		except httpx.TransportError as e:
+			raise requests.exceptions.ConnectionError(str(e))
+		return _HttpxResponse(res)
@@ -0,0 +1,69 @@
+from . import endpoints
+from .detail import frames
+from .detail.frames import ColumnBuffer
+from .quote import Quote
+
+frame_columns = [
+	('symbol', 'symbol', frames.STR),
+	('name', 'simple_name', frames.STR),
+	('instrument', 'url', frames.STR),
+	('id', 'id', frames.STR),
+	('tradeable', 'tradeable', frames.BOOL),
+	('tradability', 'tradability', frames.CATEGORY),
+	('type', 'type', frames.CATEGORY),
+]
+
+
+def tag_urls(trader, tag):
+	"""Instrument urls of a robinhood tag (ex: '100-most-popular')"""
+	return trader._req_get(endpoints.tags(tag))['instruments']
+
+
+def watchlist_urls(trader, name=None):
+	"""Instrument urls of a watchlist, or of every watchlist if `name` is None"""
+	if name:
+		watchlist_pages = [endpoints.watchlists() + name + '/']
+	else:
+		watchlist_pages = [w['url'] for page in trader._req_get_pages(endpoints.watchlists()) for w in page]
+
+	return [item['instrument']
+			for url in watchlist_pages
+			for page in trader._req_get_pages(url)
+			for item in page]
+
+
+def universe(trader, tags=None, watchlists=None, symbols=None, quotes=False):
+	"""
+	Builds a DataFrame (indexed by symbol) of every instrument of the given tags and watchlists.
+
+	Args:
+		tags: list of tag names
+		watchlists: list of watchlist names, or True for every watchlist
+		symbols: extra symbols to include
+		quotes: if True, attach a batched quote snapshot (bid, ask, mark, quote_updated_at)
+	"""
+	if isinstance(tags, str): tags = [tags]
+	if isinstance(watchlists, str): watchlists = [watchlists]
+
+	urls = []
+	for tag in tags or []:
+		urls += tag_urls(trader, tag)
+	if watchlists is True:
+		urls += watchlist_urls(trader)
+	else:
+		for name in watchlists or []:
+			urls += watchlist_urls(trader, name)
+
+	urls = list(dict.fromkeys(urls))
+	instruments = trader.instruments(urls)
+	records = [instruments[url] for url in urls if instruments[url]]
+	records += list(trader.instruments_by_symbol(symbols or []).values())  # fetched concurrently
+
+	df = ColumnBuffer(frame_columns).extend(records).to_frame()
+	df = df.drop_duplicates('symbol', ignore_index=True).set_index('symbol', drop=False)
+
+	if quotes:
+		snapshot = [q._dict for q in trader.quotes(df['symbol']) if q]
+		quote_frame = ColumnBuffer(Quote.frame_columns).extend(snapshot).to_frame(index='symbol')
+		df = df.join(quote_frame.drop(columns='symbol'))
+	return df
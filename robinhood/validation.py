@@ -0,0 +1,137 @@
+"""
+Local pre-trade checks from (cached) instrument metadata.
+
+Orders that are not tradable, are fractional on an instrument without fractional
+support, or whose prices are not on the instrument's tick grid fail here instead of
+costing a round trip to be rejected by robinhood.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+import math
+
+
+class InvalidOrder(Exception):
+	pass
+
+
+def tick_size(instrument, price=None) -> float:
+	"""The instrument's `min_tick_size`, else 0.01 (0.0001 for prices under 1$)"""
+	tick = instrument.get('min_tick_size')
+	if tick:
+		return float(tick)
+	return 0.0001 if price is not None and float(price) < 1 else 0.01
+
+
+def _decimals(tick):
+	return max(0, -int(math.floor(math.log10(tick) + 1e-9)))
+
+
+def format_price(value, tick=0.01):
+	"""Rounds a price to the nearest tick (halves up), formatted with the tick's decimals"""
+	if not value:
+		return value
+	tick = Decimal(str(float(tick)))
+	steps = (Decimal(str(value)) / tick).quantize(Decimal(1), rounding=ROUND_HALF_UP)
+	return "{0:.{1}f}".format(steps * tick, _decimals(float(tick)))
+
+
+def is_fractional(quantity) -> bool:
+	return float(quantity) != int(float(quantity))
+
+
+def check_tradable(instrument):
+	if not instrument.get('tradeable', True) or instrument.get('tradability', 'tradable') != 'tradable':
+		raise InvalidOrder(f"{instrument.get('symbol')} is not tradable")
+	if instrument.get('state', 'active') != 'active':
+		raise InvalidOrder(f"{instrument.get('symbol')} is not active")
+
+
+def validate_order(instrument, quantity, price=None, stop_price=None):
+	"""
+	Raises InvalidOrder if the order would be rejected for its instrument's rules.
+	Returns the (price, stop_price) rounded to the instrument's tick size.
+	"""
+	check_tradable(instrument)
+
+	if float(quantity) <= 0:
+		raise InvalidOrder(f"quantity must be positive, got {quantity}")
+	if is_fractional(quantity) and instrument.get('fractional_tradability') != 'tradable':
+		raise InvalidOrder(f"{instrument.get('symbol')} does not support fractional quantities")
+
+	for value in [price, stop_price]:
+		if value is not None and float(value) <= 0:
+			raise InvalidOrder(f"prices must be positive, got {value}")
+
+	price = format_price(price, tick_size(instrument, price)) if price else price
+	stop_price = format_price(stop_price, tick_size(instrument, stop_price)) if stop_price else stop_price
+	return price, stop_price
+
+
+def validate_orders(orders, instruments):
+	"""
+	Vectorized `validate_order` over a batch of orders.
+
+	Args:
+		orders: DataFrame (or list of dicts) with 'symbol', 'quantity' and optional 'price', 'stop_price' columns
+		instruments: {symbol: instrument}
+
+	Returns:
+		a DataFrame copy with 'price' and 'stop_price' rounded to each instrument's tick and formatted
+		as order payload strings (None when absent), and an 'error' column (null for valid orders)
+	"""
+	import numpy as np
+	import pandas as pd
+
+	df = pd.DataFrame(orders).copy()
+	if df.empty:
+		for column in ['price', 'stop_price', 'error']:
+			df[column] = pd.Series(dtype=object)
+		return df
+	df['symbol'] = df['symbol'].str.upper()
+	for column in ['price', 'stop_price']:
+		if column not in df:
+			df[column] = np.nan
+	info = pd.DataFrame.from_dict(
+		{symbol: instruments[symbol] for symbol in df['symbol'].unique() if symbol in instruments}, orient='index')
+	for column, default in [('tradeable', True), ('tradability', 'tradable'), ('state', 'active'),
+							('fractional_tradability', 'untradable'), ('min_tick_size', None)]:
+		if column not in info:
+			info[column] = default
+	info = info.reindex(df['symbol'])
+
+	quantity = pd.to_numeric(df['quantity'], errors='coerce').to_numpy(dtype=float)
+	price = pd.to_numeric(df['price'], errors='coerce').to_numpy(dtype=float)
+	stop_price = pd.to_numeric(df['stop_price'], errors='coerce').to_numpy(dtype=float)
+	min_tick = pd.to_numeric(info['min_tick_size'], errors='coerce').to_numpy(dtype=float)
+
+	known = info['tradability'].notna().to_numpy()
+	tradable = known & info['tradeable'].fillna(True).astype(bool).to_numpy() \
+		& (info['tradability'] == 'tradable').to_numpy() & (info['state'] == 'active').to_numpy()
+	fractional_ok = (info['fractional_tradability'] == 'tradable').to_numpy()
+	fractional = quantity != np.floor(quantity)
+
+	errors = np.full(len(df), None, dtype=object)
+	checks = [
+		(~(quantity > 0), 'quantity must be positive'),
+		(~(np.isnan(price) | (price > 0)) | ~(np.isnan(stop_price) | (stop_price > 0)), 'prices must be positive'),
+		(fractional & ~fractional_ok, 'fractional quantities are not supported'),
+		(~tradable, 'not tradable'),
+		(~known, 'unknown instrument'),
+	]
+	# later checks take precedence, the most fundamental error is reported
+	for failed, message in checks:
+		errors[failed] = message
+
+	def round_to_tick(values):
+		tick = np.where(np.isnan(min_tick), np.where(values < 1, 0.0001, 0.01), min_tick)
+		# halves round up like format_price, the inner round absorbs float error (2.675 / 0.01 = 267.49999...)
+		rounded = np.floor(np.round(values / tick, 9) + 0.5) * tick
+		decimals = np.maximum(0, -np.floor(np.log10(tick) + 1e-9)).astype(int)
+		# only the formatting to payload strings is per row
+		formatted = [None if np.isnan(value) else "{0:.{1}f}".format(value, places)
+					 for value, places in zip(rounded, decimals)]
+		return pd.Series(formatted, index=df.index, dtype=object)
+
+	df['price'] = round_to_tick(price)
+	df['stop_price'] = round_to_tick(stop_price)
+	df['error'] = pd.Series(errors, index=df.index, dtype=object)
+	return df
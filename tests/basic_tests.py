@@ -1,19 +1,71 @@
+from datetime import datetime, timezone
+import os
+import json
+import pickle
+import subprocess
+import sys
+import tempfile
+import time
 import unittest
 from unittest import TestCase
+from unittest.mock import patch
 
-from ...robinhood import Trader
-from ...robinhood.robinhood.order import Order, CryptoOrder
-from ...robinhood.robinhood.quote import Quote, CryptoQuote
+import requests
+
+import numpy as np
+import pandas as pd
+
+from robinhood import endpoints, pricing
+from robinhood import Trader, Metrics, Tracer, ResponseCache, PaperBroker
+from robinhood.order import Order, CryptoOrder
+from robinhood.quote import Quote, CryptoQuote
+from robinhood.credentials import CredentialStore, is_expired
+from robinhood.detail.ratelimit import RateLimiter, TokenBucket, endpoint_class
+from robinhood.detail.tracing import trace_methods
+from robinhood.validation import InvalidOrder, format_price, tick_size, validate_order, validate_orders
+from robinhood.transport import RecordingTransport, ReplayTransport, Http2Transport
+
+fixture = os.path.join(os.path.dirname(__file__), 'fixtures', 'basic_session.jsonl')
+
+api = 'https://api.robinhood.com'
+
+
+def get(path, response, status=200):
+	"""a recorded GET of an api path, for in-memory ReplayTransport sessions"""
+	return {'method': 'GET', 'url': api + path, 'status': status, 'response': response}
+
+
+def page(results, next=None):
+	return {'next': next and api + next, 'results': results}
+
+
+def sent(trader):
+	"""paths of the requests a ReplayTransport received, without their query"""
+	return [url[len(api):].split('?')[0] for _, url in trader.transport.requests]
+
+
+# ROBINHOOD_RECORD=1 runs the tests against the live api (console login prompt)
+# and re-records the fixture, otherwise the recorded session is replayed offline
+record = os.environ.get('ROBINHOOD_RECORD') == '1'
 
 
 class TestAll(TestCase):
 
 	# basic tests to ensure the endpoints work
 
-	def __init__(self, *args, **kwargs):
-		self.trader = Trader()
-		self.trader.login()  # will supply console prompt
-		TestCase.__init__(self, *args, **kwargs)
+	@classmethod
+	def setUpClass(cls):
+		cls.trader = Trader()
+		if record:
+			cls.trader.login()  # will supply console prompt
+			cls.trader.transport = RecordingTransport(cls.trader.session, fixture)
+		else:
+			cls.trader.transport = ReplayTransport(fixture)
+
+	@classmethod
+	def tearDownClass(cls):
+		if record:
+			cls.trader.transport.save()
 
 	def test_fundamentals(self):
 		f = self.trader.fundamentals('aapl')
@@ -23,6 +75,13 @@ class TestAll(TestCase):
 		i = self.trader.instrument('aapl')
 		assert(isinstance(i, dict))
 
+	def test_invalid_symbol(self):
+		trader = Trader(transport=ReplayTransport([get('/instruments/?symbol=BAD', page([]))]))
+		for _ in range(2):
+			with self.assertRaises(Exception):
+				trader.instrument('bad')
+		assert len(trader.transport.requests) == 1  # the miss is cached for `invalid_symbol_ttl`
+
 	def test_quote(self):
 		q = self.trader.quote('aapl')
 		assert(isinstance(q, Quote))
@@ -36,7 +95,7 @@ class TestAll(TestCase):
 		]
 		assert all([isinstance(value, float) for value in data])
 
-		q = self.trader.quote('btc')
+		q = self.trader.crypto.quote('btc')
 		assert isinstance(q, CryptoQuote)
 		data = [
 			q.ask,
@@ -45,39 +104,670 @@ class TestAll(TestCase):
 		]
 		assert all([isinstance(value, float) for value in data])
 
+	def test_quotes(self):
+		qs = self.trader.quotes(['aapl', 'msft'])
+		assert [q.symbol for q in qs] == ['AAPL', 'MSFT']
+
 	def test_orders(self):
 		os = self.trader.orders()
 		assert all([isinstance(order, Order) for order in os])
 
-		os = self.trader.crypto_orders()
+		os = self.trader.crypto.orders()
 		assert all([isinstance(order, CryptoOrder) for order in os])
 
+	def test_orders_frame(self):
+		df = self.trader.orders_frame()  # follows the 'next' page
+		assert len(df['id'].unique()) == 3
+		crypto = self.trader.crypto_orders_frame()
+		assert len(crypto) == 1
+
+		for frame in [df, crypto]:
+			for column in ['price', 'average_price', 'quantity', 'cumulative_quantity', 'execution_price', 'execution_quantity']:
+				assert frame[column].dtype == np.float64, column
+			for column in ['created_at', 'updated_at', 'last_transaction_at', 'execution_timestamp']:
+				assert pd.api.types.is_datetime64_any_dtype(frame[column]), column
+			for column in ['side', 'type', 'state', 'time_in_force']:
+				assert isinstance(frame[column].dtype, pd.CategoricalDtype), column
+			assert 'executions' not in frame and 'execution_id' in frame  # one row per execution
+		assert isinstance(df['trigger'].dtype, pd.CategoricalDtype) and df['fees'].dtype == np.float64
+
 	def test_account_data(self):
-		funcs = ['account',
-				'crypto_account',
-				'portfolio',
-				'orders',
-				'crypto_orders',
-				'dividends',
-				'positions']
+		funcs = [self.trader.account,
+				self.trader.crypto.account,
+				self.trader.portfolio,
+				self.trader.orders,
+				self.trader.crypto.orders,
+				self.trader.dividends,
+				self.trader.positions]
+
+		for function in funcs:
+			function()
+
+	def test_rate_limiter(self):
+		bucket = TokenBucket(rate=10, burst=2)
+		assert bucket.reserve() == 0 and bucket.reserve() == 0
+		assert 0.05 < bucket.reserve() <= 0.1  # the third token is 1/rate away
+
+		orders = 'https://api.robinhood.com/orders/'
+		assert endpoint_class(orders, 'POST') == 'orders'
+		assert endpoint_class(orders + '123/cancel/', 'POST') == 'cancels'
+		assert endpoint_class(orders + '?updated_at[gte]=x') == 'account'
+		assert endpoint_class('https://api.robinhood.com/quotes/?symbols=AAPL') == 'market_data'
+		assert RateLimiter().buckets == {}  # client side limits are opt-in
+
+		url = 'https://api.robinhood.com/fundamentals/AAPL/'
+		trader = Trader(transport=ReplayTransport([
+			{'method': 'GET', 'url': url, 'status': 429, 'headers': {'Retry-After': '0.05'}, 'response': {}},
+			{'method': 'GET', 'url': url, 'status': 200, 'response': {'symbol': 'AAPL'}},
+		]))
+		started = time.monotonic()
+		assert trader.fundamentals('aapl') == {'symbol': 'AAPL'}
+		assert time.monotonic() - started >= 0.05
+		assert trader.rate_limiter.stats['market_data']['retries'] == 1
+
+	def test_token_renewal(self):
+		token_url = 'https://api.robinhood.com/oauth2/token/'
+		url = 'https://api.robinhood.com/fundamentals/AAPL/'
+
+		def token(expires_in=None):
+			response = {'access_token': 'access', 'refresh_token': 'refresh'}
+			if expires_in:
+				response['expires_in'] = expires_in
+			return {'method': 'POST', 'url': token_url, 'status': 200, 'response': response}
+
+		# an expired token is renewed before the request is sent
+		trader = Trader(transport=ReplayTransport([token(), {'method': 'GET', 'url': url, 'status': 200, 'response': {}}]))
+		trader.refresh_token, trader.token_expires_at = 'refresh', time.time() - 1
+		trader.fundamentals('aapl')
+		assert trader.transport.requests == [('POST', token_url), ('GET', url)]
+
+		# a 401 is retried once after a renewal
+		trader = Trader(transport=ReplayTransport([token(), {'method': 'GET', 'url': url, 'status': 401, 'response': {}},
+												   {'method': 'GET', 'url': url, 'status': 200, 'response': {}}]))
+		trader.refresh_token = 'refresh'
+		trader.fundamentals('aapl')
+		assert trader.transport.requests == [('GET', url), ('POST', token_url), ('GET', url)]
+
+		# a token living less than the margin is renewed at half its life, not in a loop
+		trader = Trader(transport=ReplayTransport([token(expires_in=0.4)]))
+		trader.token_refresh_retry = 0.05
+		try:
+			trader.refresh_login('refresh')
+			time.sleep(0.5)
+		finally:
+			trader.stop_token_refresh()
+		assert 2 <= len(trader.transport.requests) <= 6, len(trader.transport.requests)
+
+	def test_order_timeout(self):
+		orders_url = 'https://api.robinhood.com/orders/'
+
+		class TimeoutOnce:
+			"""the first order submission times out before reaching `inner`"""
+			def __init__(self, inner):
+				self.inner, self.timed_out = inner, False
+
+			def request(self, method, url, **kwargs):
+				if method == 'POST' and not self.timed_out:
+					self.timed_out = True
+					raise requests.exceptions.ReadTimeout()
+				return self.inner.request(method, url, **kwargs)
+
+		def trader(records):
+			trader = Trader(transport=TimeoutOnce(ReplayTransport(records)))
+			trader.order_lookup_delay = 0
+			return trader
+
+		def listing(*orders):
+			return {'method': 'GET', 'url': orders_url + '?updated_at[gte]=x', 'status': 200,
+					'response': {'next': None, 'results': list(orders)}}
+
+		# the order was received: found by its ref_id, not resubmitted
+		found = trader([listing({'id': '1', 'ref_id': 'received'})])
+		assert found._submit_order({'ref_id': 'received'}, orders_url)['id'] == '1'
+		assert [method for method, _ in found.transport.inner.requests] == ['GET']
+
+		# both lookups miss: resubmitted once
+		lost = trader([listing(), {'method': 'POST', 'url': orders_url, 'status': 201, 'response': {'id': '2', 'ref_id': 'lost'}}])
+		assert lost._submit_order({'ref_id': 'lost'}, orders_url)['id'] == '2'
+		assert [method for method, _ in lost.transport.inner.requests] == ['GET', 'GET', 'POST']
+
+	def test_validation(self):
+		assert format_price(0.12345, 0.0001) == '0.1235'  # halves round up
+		assert format_price(2.675, 0.01) == '2.68'
+		assert format_price(10.03, 0.05) == '10.05'
+		assert tick_size({'min_tick_size': None}, 0.5) == 0.0001 and tick_size({}, 5) == 0.01
+
+		stock = {'symbol': 'XYZ', 'tradeable': True, 'tradability': 'tradable', 'state': 'active',
+				 'fractional_tradability': 'untradable', 'min_tick_size': '0.05', 'url': 'https://api.robinhood.com/instruments/xyz/'}
+		assert validate_order(stock, 1, 10.03, 9.97) == ('10.05', '9.95')
+		for instrument, quantity in [(dict(stock, tradability='untradable'), 1), (dict(stock, state='inactive'), 1),
+									 (stock, 0.5), (stock, 0)]:
+			with self.assertRaises(InvalidOrder):
+				validate_order(instrument, quantity, 10.0)
+
+		df = validate_orders([{'symbol': 'xyz', 'quantity': 1, 'price': 10.03},
+							  {'symbol': 'xyz', 'quantity': 0.5},
+							  {'symbol': 'abc', 'quantity': 1}], {'XYZ': stock})
+		assert list(df['price']) == ['10.05', None, None]
+		assert list(df['error']) == [None, 'fractional quantities are not supported', 'unknown instrument']
+		df = validate_orders([{'symbol': 'xyz', 'quantity': 1, 'price': price} for price in [2.675, 0.12345, 1.005]],
+							 {'XYZ': dict(stock, min_tick_size=None)})
+		assert list(df['price']) == ['2.68', '0.1235', '1.01']  # same rounding as format_price
+		assert list(validate_orders([], {}).columns) == ['price', 'stop_price', 'error']
+
+		# an invalid order fails before its quote and account are requested
+		untradable = dict(stock, tradability='untradable')
+		trader = Trader(transport=ReplayTransport([{'method': 'GET', 'url': 'https://api.robinhood.com/instruments/?symbol=XYZ',
+													'status': 200, 'response': {'next': None, 'results': [untradable]}}]))
+		with self.assertRaises(InvalidOrder):
+			trader.buy('xyz', 1)
+		assert len(trader.transport.requests) == 1
+
+	def test_paper_fills(self):
+		def order(side, quantity, type='market', price=None, stop_price=None):
+			payload = {'symbol': 'AAPL', 'side': side, 'quantity': quantity, 'type': type,
+					   'trigger': 'stop' if stop_price else 'immediate'}
+			return dict(payload, **{k: str(v) for k, v in [('price', price), ('stop_price', stop_price)] if v})
+
+		broker = PaperBroker(cash=1000)
+		broker.set_quote('AAPL', bid=99.0, ask=100.0)
+		market = broker.submit(order('buy', 2))
+		assert market['state'] == 'filled' and market['average_price'] == '100.0'
+		assert broker.cash == 800 and broker.position('aapl') == 2
+
+		# limits wait for the market to cross them, and fill at the better of open and limit on bars
+		limit = broker.submit(order('buy', 1, 'limit', price=95))
+		assert broker.orders[limit['id']]['state'] == 'queued'
+		broker.on_bar('AAPL', open=97, high=98, low=94, close=96)
+		assert broker.orders[limit['id']]['average_price'] == '95.0'
+
+		# stops trigger at the stop price, then fill as market orders
+		stop = broker.submit(order('sell', 3, stop_price=90))
+		broker.set_quote('AAPL', bid=91.0, ask=92.0)
+		assert broker.orders[stop['id']]['state'] == 'queued'
+		broker.on_bar('AAPL', open=92, high=92, low=85, close=86)
+		assert broker.orders[stop['id']]['average_price'] == '90.0' and broker.position('AAPL') == 0
+		assert broker.cash == 800 - 95 + 270
+
+		cancelled = broker.submit(order('buy', 1, 'limit', price=10))
+		assert broker.cancel(cancelled['id'])['state'] == 'cancelled'
+		broker.set_quote('AAPL', bid=5.0, ask=5.0)
+		assert broker.orders[cancelled['id']]['state'] == 'cancelled'
+
+		assert broker.submit(order('buy', 10 ** 6))['state'] == 'rejected'  # buying power
+		assert broker.submit(order('sell', 1))['state'] == 'rejected'        # no shares, shorting disabled
+
+		# through the Trader api
+		trader = broker.attach(Trader())
+		placed = trader.buy('aapl', 1)
+		assert isinstance(placed, Order) and placed.filled() and broker.position('AAPL') == 1
+
+	def test_place_orders(self):
+		def instrument(symbol, **fields):
+			return get(f'/instruments/?symbol={symbol}', page([dict(
+				{'symbol': symbol, 'url': f'{api}/instruments/{symbol}/', 'tradability': 'tradable'}, **fields)]))
+
+		trader = Trader(transport=ReplayTransport([
+			get('/accounts/', {'results': [{'url': api + '/accounts/paper/'}]}),
+			instrument('AAPL'), instrument('MSFT'), instrument('XYZ', tradability='untradable'),
+			get('/instruments/?symbol=BAD', page([])),
+			get('/quotes/?symbols=AAPL,MSFT', {'results': [{'symbol': 'AAPL', 'last_trade_price': '100.0'},
+														   {'symbol': 'MSFT', 'last_trade_price': '200.0'}]}),
+			{'method': 'POST', 'url': api + '/orders/', 'status': 201, 'response': {'id': '1', 'state': 'queued'}},
+		]))
+		results = trader.place_orders([
+			{'symbol': 'aapl', 'quantity': 1, 'side': 'buy'},
+			{'symbol': 'msft', 'quantity': 1, 'side': 'sell'},
+			{'symbol': 'aapl', 'quantity': 1, 'side': 'buy', 'price': 99.0},
+			{'symbol': 'bad', 'quantity': 1, 'side': 'buy'},
+			{'symbol': 'xyz', 'quantity': 1, 'side': 'buy'},
+		])
+
+		assert [type(result) for result in results] == [Order, Order, Order, Exception, InvalidOrder]
+		paths = sent(trader)
+		assert paths.count('/accounts/') == 1
+		assert paths.count('/quotes/') == 1  # one batch for both symbols
+		assert [method for method, _ in trader.transport.requests].count('POST') == paths.count('/orders/') == 3
+		assert 'Sec-Fetch-Site' not in trader.session.headers  # posts leave the shared headers alone
+
+	def test_cancel_all(self):
+		orders_url = 'https://api.robinhood.com/orders/'
+
+		def order(order_id, state, side='buy'):
+			return {'id': order_id, 'state': state, 'side': side, 'cancel': f'{orders_url}{order_id}/cancel/'}
+
+		def cancel(order_id, status=200):
+			return {'method': 'POST', 'url': f'{orders_url}{order_id}/cancel/', 'status': status, 'response': {}}
+
+		listing = [order('1', 'queued'), order('2', 'confirmed'), order('3', 'queued', 'sell'), order('4', 'filled')]
+		trader = Trader(transport=ReplayTransport([
+			{'method': 'GET', 'url': orders_url, 'status': 200, 'response': {'next': None, 'results': listing}},
+			cancel('1'), cancel('2', status=404),
+			{'method': 'GET', 'url': orders_url + '?updated_at[gte]=x', 'status': 200,
+			 'response': {'next': None, 'results': [order('1', 'cancelled')]}},
+		]))
+		results = trader.cancel_all(lambda order: order['side'] == 'buy')
+
+		assert isinstance(results[0], Order) and results[0]['state'] == 'cancelled'
+		assert isinstance(results[1], Exception)  # a failed cancel does not stop the others
+		assert len(results) == 2  # the sell and the filled order were not cancelled
+		methods = [method for method, _ in trader.transport.requests]
+		assert methods == ['GET', 'POST', 'POST', 'GET']  # open orders, the cancels, one confirming listing
+		assert trader.rate_limiter.throttled_seconds == 0
+		assert trader.cancel_many([]) == []
+
+	def test_pricing(self):
+		# reference values: S=100, K=100, T=1, r=5%, vol=20% (and Hull's S=42, K=40, T=0.5, r=10%)
+		assert abs(pricing.price(100, 100, 1, 0.2, True, 0.05) - 10.4506) < 1e-4
+		assert abs(pricing.price(100, 100, 1, 0.2, False, 0.05) - 5.5735) < 1e-4
+		assert abs(pricing.price(42, 40, 0.5, 0.2, False, 0.1) - 0.8086) < 1e-4
+		greeks = pricing.greeks(100, 100, 1, 0.2, True, 0.05)
+		expected = {'delta': 0.6368, 'gamma': 0.01876, 'theta': -6.414 / 365, 'vega': 0.3752, 'rho': 0.5323}
+		for name, value in expected.items():
+			assert abs(greeks[name] - value) < 1e-4, name
+
+		# at expiry options are worth their intrinsic value
+		assert abs(pricing.price(110, 100, 0, 0.2, True) - 10) < 1e-9 and pricing.price(110, 100, 0, 0.2, False) < 1e-9
+		assert abs(pricing.greeks(110, 100, 0, 0.2, True)['delta'] - 1) < 1e-9
+
+		vols = np.array([0.15, 0.45, 0.8])
+		for spot, is_call in [(100, True), (100, False), (200, True), (50, False)]:  # atm and deep itm
+			prices = pricing.price(spot, 100, 0.5, vols, is_call, 0.05)
+			iv = pricing.implied_volatility(prices, spot, 100, 0.5, is_call, 0.05)
+			assert np.allclose(pricing.price(spot, 100, 0.5, iv, is_call, 0.05), prices, atol=1e-6)
+			# deep itm prices barely depend on low volatilities, only the higher ones are recovered
+			identified = slice(None) if spot == 100 else slice(1, None)
+			assert np.allclose(iv[identified], vols[identified], atol=1e-4)
+
+		# outside of the no-arbitrage bounds, or not converged: NaN
+		assert np.isnan(pricing.implied_volatility([0.5, 150.0], 100, 100, 1, True, 0.05)).all()
+		assert np.isnan(pricing.implied_volatility(10.4506, 100, 100, 1, True, 0.05, max_iterations=1))
+
+	def test_portfolio_snapshot(self):
+		def position(symbol, quantity, average):
+			return {'instrument': f'{api}/instruments/{symbol}/', 'quantity': quantity, 'average_buy_price': average}
+
+		trader = Trader(transport=ReplayTransport([
+			get('/positions/?nonzero=true', page([position('A', '2', '10'), position('B', '1', '50')], '/positions/?nonzero=true&cursor=2')),
+			get('/positions/?nonzero=true&cursor=2', page([position('C', '4', '5')])),
+			get('/instruments/A/', {'symbol': 'A', 'url': f'{api}/instruments/A/'}),
+			get('/instruments/B/', {'symbol': 'B', 'url': f'{api}/instruments/B/'}),
+			get('/instruments/C/', {'symbol': 'C', 'url': f'{api}/instruments/C/'}),
+			get('/quotes/?symbols=A,B,C', {'results': [{'symbol': 'A', 'last_trade_price': '12'},
+													   {'symbol': 'B', 'last_trade_price': '40'}, None]}),
+		]))
+		snapshot = trader.portfolio_snapshot()
+
+		assert list(snapshot.frame['symbol']) == ['A', 'B', 'C']
+		assert snapshot.cost_basis == 20 + 50 + 20
+		assert snapshot.market_value == 24 + 40  # C has no quote
+		assert snapshot.frame.loc['A', 'unrealized_pl_percent'] == 20
+		assert sent(trader).count('/positions/') == 2 and sent(trader).count('/quotes/') == 1  # one quote batch
+
+		snapshot.refresh()  # instruments are cached
+		assert len([path for path in sent(trader) if path.startswith('/instruments/')]) == 3
+
+		empty = Trader(transport=ReplayTransport([get('/positions/?nonzero=true', page([]))]))
+		snapshot = empty.portfolio_snapshot()
+		assert len(snapshot) == 0 and snapshot.market_value == 0
+		assert sent(empty) == ['/positions/']
+
+	def test_dividends_store(self):
+		instrument = get('/instruments/A/', {'symbol': 'A', 'url': f'{api}/instruments/A/'})
+
+		def dividend(dividend_id, state):
+			return {'id': dividend_id, 'state': state, 'amount': '1.5', 'instrument': f'{api}/instruments/A/',
+					'payable_date': f'2020-0{dividend_id}-15'}
+
+		with tempfile.TemporaryDirectory() as directory:
+			path = os.path.join(directory, 'dividends.json')
+			first = Trader(transport=ReplayTransport([
+				get('/dividends/', page([dividend('2', 'paid')], '/dividends/?cursor=2')),
+				get('/dividends/?cursor=2', page([dividend('1', 'paid')])), instrument]))
+			assert list(first.dividends_frame(path)['id']) == ['1', '2']
+
+			# paging stops at the first page of records already stored in a final state
+			later = Trader(transport=ReplayTransport([
+				get('/dividends/', page([dividend('3', 'pending')], '/dividends/?cursor=2')),
+				get('/dividends/?cursor=2', page([dividend('2', 'paid')], '/dividends/?cursor=3')),
+				get('/dividends/?cursor=3', page([dividend('1', 'paid')])), instrument]))
+			df = later.dividends_frame(path)
+			assert sent(later).count('/dividends/') == 2
+			assert list(df['id']) == ['1', '2', '3'] and list(df['symbol']) == ['A'] * 3
+			assert df['amount'].sum() == 4.5
+
+		empty = Trader(transport=ReplayTransport([get('/dividends/', page([]))]))
+		assert len(empty.dividends_frame()) == 0 and sent(empty) == ['/dividends/']
+
+	def test_options_chain(self):
+		dates = ['2020-05-15', '2020-05-22']
+		contracts = [{'id': str(i), 'url': f'{api}/options/instruments/{i}/', 'chain_symbol': 'AAPL', 'type': 'call',
+					  'expiration_date': date, 'strike_price': strike, 'tradability': 'tradable'}
+					 for i, (date, strike) in enumerate([(dates[1], '300'), (dates[0], '310'), (dates[0], '300')])]
+
+		def market_data(*ids):
+			return get('/marketdata/options/?instruments=' + ','.join(contracts[i]['url'] for i in ids),
+					   {'results': [{'instrument': contracts[i]['url'], 'bid_price': str(i), 'mark_price': '1.0'} for i in ids]})
+
+		trader = Trader(transport=ReplayTransport([
+			get('/instruments/?symbol=AAPL', page([{'symbol': 'AAPL', 'id': 'aapl-id', 'url': f'{api}/instruments/aapl-id/'}])),
+			get('/options/chains/?equity_instrument_ids=aapl-id', page([{'id': 'chain-id', 'expiration_dates': dates}])),
+			get('/options/instruments/?chain_id=chain-id&expiration_dates=' + ','.join(dates) +
+				'&state=active&tradability=tradable&type=call', page(contracts)),
+			market_data(0, 1), market_data(2),
+		]))
+		trader.option_batch_size = 2
+		df = trader.options_frame('aapl', option_type='call')
+
+		assert list(df['id']) == ['2', '1', '0']  # by expiration, then strike
+		assert list(df['bid']) == [2.0, 1.0, 0.0]
+		assert sent(trader).count('/options/instruments/') == 1  # every expiration in one request
+		assert sent(trader).count('/marketdata/options/') == 2   # 3 contracts, 2 per request
+
+		trader.options_frame('aapl', option_type='call')
+		assert sent(trader).count('/options/chains/') == 1 and sent(trader).count('/options/instruments/') == 1
+		assert trader.option_market_data([]) == {}
+
+	def test_fundamentals_many(self):
+		def fundamentals(symbol):
+			return {'market_cap': '1000', 'pe_ratio': '20.5', 'sector': 'Technology', 'instrument': f'{api}/instruments/{symbol}/'}
+
+		trader = Trader(transport=ReplayTransport([
+			get('/fundamentals/?symbols=A,B', {'results': [fundamentals('A'), fundamentals('B')]}),
+			get('/fundamentals/?symbols=BAD', {'results': [None]}),
+		]))
+		trader.fundamentals_batch_size = 2
+		df = trader.fundamentals_many(['a', 'b', 'bad', 'a'])
+
+		assert list(df.index) == ['A', 'B'] and list(df['pe_ratio']) == [20.5, 20.5]
+		assert sent(trader) == ['/fundamentals/'] * 2  # 3 symbols, 2 per request
+
+		trader.fundamentals_many(['b', 'a'])  # cached
+		assert len(trader.transport.requests) == 2
+		assert len(trader.fundamentals_many([])) == 0 and len(trader.transport.requests) == 2
+
+	def test_universe(self):
+		def instrument(symbol):
+			return get(f'/instruments/{symbol}/', {'symbol': symbol, 'url': f'{api}/instruments/{symbol}/',
+												   'tradeable': True, 'tradability': 'tradable', 'type': 'stock'})
+
+		trader = Trader(transport=ReplayTransport([
+			get('/midlands/tags/tag/popular/', {'instruments': [f'{api}/instruments/A/', f'{api}/instruments/B/']}),
+			get('/watchlists/', page([{'url': f'{api}/watchlists/Default/'}])),
+			get('/watchlists/Default/', page([{'instrument': f'{api}/instruments/B/'}, {'instrument': f'{api}/instruments/C/'}])),
+			instrument('A'), instrument('B'), instrument('C'),
+			get('/quotes/?symbols=A,B,C', {'results': [{'symbol': s, 'bid_price': '1.5', 'last_trade_price': '2'} for s in 'ABC']}),
+		]))
+		df = trader.universe(tags=['popular'], watchlists=True, quotes=True)
+
+		assert list(df.index) == ['A', 'B', 'C']  # B, in the tag and the watchlist, appears once
+		assert list(df['bid']) == [1.5] * 3
+		assert sent(trader).count('/quotes/') == 1  # one quote batch
+		assert len([path for path in sent(trader) if path.startswith('/instruments/')]) == 3
+
+		assert trader.tag_symbols('popular') == ['A', 'B']  # instruments are cached
+		assert len([path for path in sent(trader) if path.startswith('/instruments/')]) == 3
+
+		def by_symbol(symbol):
+			return get(f'/instruments/?symbol={symbol}', page([{'symbol': symbol, 'url': f'{api}/instruments/{symbol}/'}]))
+
+		extra = Trader(transport=ReplayTransport([by_symbol('D'), by_symbol('E')]))
+		assert list(extra.universe(symbols=['d', 'e', 'd']).index) == ['D', 'E']
+		assert len(extra.transport.requests) == 2
+		assert list(extra.universe(symbols=['e']).index) == ['E'] and len(extra.transport.requests) == 2  # cached
+
+		empty = Trader(transport=ReplayTransport([get('/midlands/tags/tag/none/', {'instruments': []})]))
+		assert len(empty.universe(tags='none', quotes=True)) == 0 and sent(empty) == ['/midlands/tags/tag/none/']
+
+	def test_credentials(self):
+		with tempfile.TemporaryDirectory() as directory:
+			path = os.path.join(directory, 'credentials.json')
+			with open(path + '.tmp', 'w') as file:  # leftover of an interrupted save, world readable
+				file.write('{}')
+			os.chmod(path + '.tmp', 0o644)
+
+			trader = Trader(transport=ReplayTransport([]))
+			trader.auto_refresh_token = False
+			trader._set_tokens({'access_token': 'access', 'refresh_token': 'refresh', 'expires_in': 3600})
+			trader.device_token = 'device'
+			trader.save_credentials(path)
+
+			assert os.stat(path).st_mode & 0o777 == 0o600
+			with open(path) as file:
+				assert sorted(json.load(file)) == ['access_token', 'device_token', 'expires_at', 'refresh_token']
+
+			resumed = Trader(transport=ReplayTransport([]))
+			resumed.auto_refresh_token = False
+			resumed.login_from_credentials(path)  # the stored token is still valid: no request
+			assert resumed.credentials() == trader.credentials() and resumed.transport.requests == []
+			assert resumed.session.headers['Authorization'] == 'Bearer access'
+
+			CredentialStore(path).save(dict(trader.credentials(), password='hunter2'))  # only token fields are stored
+			with open(path) as file:
+				assert 'hunter2' not in file.read()
+			assert is_expired({'access_token': 'access', 'expires_at': time.time() + 30})
+
+	def test_recording_secrets(self):
+		login = {'method': 'POST', 'url': endpoints.login(), 'status': 200,
+				'response': {'access_token': 'secret-access', 'refresh_token': 'secret-refresh', 'expires_in': 3600}}
+		trader = Trader(transport=ReplayTransport([login]))
+		trader.auto_refresh_token = False
+		trader.transport = RecordingTransport(trader.transport)
+		trader.login('alice@example.com', 'hunter2', device_token='secret-device')
+
+		with tempfile.TemporaryDirectory() as directory:
+			path = os.path.join(directory, 'session.jsonl')
+			trader.transport.save(path)
+			with open(path) as file:
+				recording = file.read()
+		assert trader.auth_token == 'secret-access'
+		for secret in ['alice@example.com', 'hunter2', 'secret-']:
+			assert secret not in recording
+
+	def test_metrics(self):
+		self.trader.metrics = metrics = Metrics()
+		try:
+			self.trader.orders_frame()
+			self.trader.fundamentals('aapl')
+		finally:
+			self.trader.metrics = None
+
+		endpoints = metrics.snapshot()
+		assert endpoints[('GET', 'api/orders/')]['count'] == 2
+		assert ('GET', 'api/fundamentals/{id}/') in endpoints
+		assert 'robinhood_request_duration_seconds_bucket' in metrics.prometheus()
+
+	def test_tracing(self):
+		self.trader.tracer = tracer = Tracer()
+		try:
+			self.trader.orders_frame()
+		finally:
+			self.trader.tracer = None
+
+		operation, = [span for span in tracer.spans if span['kind'] == 'operation']
+		requests = [span for span in tracer.spans if span['kind'] == 'request']
+		assert operation['name'] == 'Trader.orders_frame'
+		assert len(requests) == 2 and all(span['parent_id'] == operation['span_id'] for span in requests)
+
+	def test_tracing_secrets(self):
+		token = {'method': 'POST', 'url': 'https://api.robinhood.com/oauth2/token/', 'status': 200,
+				 'response': {'access_token': 'access-secret', 'refresh_token': 'refresh-secret'}}
+		trader = Trader(transport=ReplayTransport([token]))
+		with tempfile.TemporaryDirectory() as directory:
+			path = os.path.join(directory, 'traces.jsonl')
+			trader.tracer = Tracer(path)
+			trader.login('bob', 'hunter2', device_token='device-secret')
+			trader.refresh_login(refresh_token='refresh-secret')
+			trader.tracer.close()
+			with open(path) as file:
+				exported = file.read()
+
+		assert [span['name'] for span in trader.tracer.spans if span['kind'] == 'operation'] == \
+			['Trader.login', 'Trader.refresh_login']
+		for secret in ['bob', 'hunter2', 'device-secret', 'access-secret', 'refresh-secret']:
+			assert secret not in exported, secret
+
+		@trace_methods(lambda client: client.tracer)
+		class Client:
+			tracer = Tracer()
+
+			def send(self, symbol, password=None, token=None):
+				pass
+
+		Client().send('aapl', password='hunter2', token='access-secret')
+		assert Client.tracer.spans[0]['attributes'] == {'symbol': 'aapl'}
+
+	def test_tracing_generators(self):
+		trader = Trader(transport=ReplayTransport(fixture))
+		trader.tracer = tracer = Tracer()
+		orders = [Order(trader, {'id': '1', 'state': 'filled'}, False)]
+		assert list(trader.watch_orders(orders)) == orders
+
+		stream = trader.crypto.stream_quotes(['btc'], interval=0)
+		assert isinstance(next(stream)[0], CryptoQuote) and isinstance(next(stream)[0], CryptoQuote)
+		stream.close()
+		# the pollers get no span of their own, each poll is a root operation
+		operations = [span for span in tracer.spans if span['kind'] == 'operation']
+		assert [span['name'] for span in operations] == ['CryptoTrader.quote'] * 2
+		assert all(span['parent_id'] is None for span in operations)
+
+	def test_lazy_imports(self):
+		# pandas and dateutil are only imported by the code paths that use them, six is no longer used
+		script = "import sys, robinhood; print(','.join(m for m in ['pandas', 'dateutil', 'six'] if m in sys.modules))"
+		root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+		loaded = subprocess.check_output([sys.executable, '-c', script], cwd=root, text=True).strip()
+		assert loaded == '', loaded
+
+	def test_local_times(self):
+		# quotes and orders are stamped with a datetime, not a pd.Timestamp (pandas is a lazy import)
+		quote = Quote({'symbol': 'AAPL'})
+		order = Order(self.trader, {'id': '1', 'state': 'queued'})
+		assert type(quote.time) is datetime and type(order.time) is datetime
+
+	def test_response_cache(self):
+		trader = Trader(transport=ReplayTransport(fixture))
+		trader.response_cache = ResponseCache()
+		first = trader.fundamentals('aapl')
+		first['ceo'] = None
+		second = trader.fundamentals('aapl')
+
+		assert len(trader.transport.requests) == 1
+		assert second['ceo'] is not None  # every hit is a fresh copy
+
+	def test_pickling(self):
+		# save_session pickles the trader with everything attached, locks are recreated on load
+		trader = Trader(transport=ReplayTransport(fixture))
+		trader.metrics, trader.tracer, trader.response_cache = Metrics(), Tracer(), ResponseCache()
+		trader.rate_limiter = RateLimiter({'account': (5, 5)})
+		trader.fundamentals('aapl')
+
+		loaded = pickle.loads(pickle.dumps(trader))
+		assert loaded.metrics.snapshot() == trader.metrics.snapshot()
+		assert loaded.tracer.spans == trader.tracer.spans
+		for holder in [loaded.metrics, loaded.tracer, loaded.response_cache, loaded.rate_limiter,
+				loaded.rate_limiter.buckets['account'], loaded._instrument_cache]:
+			with holder._lock:
+				pass
+		assert loaded._token_refresher is None and loaded._keepalive is None
+		loaded.fundamentals('aapl')  # served by the unpickled response cache
+
+	def test_market_calendar(self):
+		def hours(date, is_open, next_date):
+			base = 'https://api.robinhood.com/markets/XNYS/hours/'
+			times = {'opens_at': f'{date}T13:30:00Z', 'closes_at': f'{date}T20:00:00Z',
+					'extended_opens_at': f'{date}T13:00:00Z', 'extended_closes_at': f'{date}T22:00:00Z'}
+			response = dict(times if is_open else dict.fromkeys(times), date=date, is_open=is_open,
+							next_open_hours=base + next_date + '/')
+			return {'method': 'GET', 'url': base + date + '/', 'status': 200, 'response': response}
+
+		trader = Trader(transport=ReplayTransport([  # thursday to monday
+			hours('2020-04-30', True, '2020-05-01'),
+			hours('2020-05-01', True, '2020-05-04'),
+			hours('2020-05-02', False, '2020-05-04'),
+			hours('2020-05-03', False, '2020-05-04'),
+			hours('2020-05-04', True, '2020-05-05'),
+		]))
+		calendar = trader.market_calendar
+		friday = datetime(2020, 5, 1, 21, tzinfo=timezone.utc)
+
+		assert not calendar.is_open(friday) and calendar.is_open(friday, extended=True)
+		assert calendar.next_open(friday) == datetime(2020, 5, 4, 13, 30, tzinfo=timezone.utc)
+		assert calendar.seconds_until_open(friday, extended=True) == 0
+		assert not calendar.is_open(datetime(2020, 5, 3, 1, tzinfo=timezone.utc), extended=True)
+		assert calendar.is_open(datetime(2020, 5, 4, 14, tzinfo=timezone.utc))
+
+		requests = len(trader.transport.requests)
+		calendar.is_open(friday)
+		assert len(trader.transport.requests) == requests  # hours are cached
+		with self.assertRaises(Exception):
+			calendar.is_open(datetime(2020, 5, 1, 21))  # naive: local or utc time?
+
+		calendar.seconds_until_open = lambda extended=False: 150
+		with patch('robinhood.markets.time.sleep') as sleep:
+			assert calendar.wait_until_open() == 150
+		assert [call.args[0] for call in sleep.call_args_list] == [60, 60, 30]  # bounded steps
+
+	def test_warmup_keepalive(self):
+		from benchmarks.stub_server import StubServer, StubTransport
+
+		with StubServer(latency=0.05) as server:
+			trader = Trader()
+			trader.transport = StubTransport(server.url, trader.session)
+			seconds = trader.warmup(connections=2)
+			assert sorted(seconds) == sorted(['https://api.robinhood.com/', 'https://nummus.robinhood.com/'])
+
+			opened = server.api.connections
+			assert opened >= 2  # concurrent warmup requests each opened a pooled connection
+			trader.quote('aapl')
+			trader.crypto.quote('btc')
+			assert server.api.connections == opened  # later requests reuse them
+
+			before = server.api.requests
+			trader.start_keepalive(interval=0.01)
+			thread, _ = trader._keepalive
+			time.sleep(0.3)
+			trader.stop_keepalive()
+			thread.join(1)
+			assert not thread.is_alive() and trader._keepalive is None
+			requests = server.api.requests
+			assert requests > before
+			time.sleep(0.1)
+			assert server.api.requests == requests  # no keepalive request after the stop
+
+	def test_http2(self):
+		try:
+			from benchmarks.stub_server import Http2StubServer, StubTransport
+			server = Http2StubServer()
+		except ImportError:
+			self.skipTest('h2 is not installed')
+
+		with server:
+			trader = Trader()
+			transport = Http2Transport(trader.session, http1=False)
+			if not transport.http2:
+				self.skipTest('httpx is not installed')
+			trader.transport = StubTransport(server.url, trader.session, transport)
+			trader.max_workers = 8
+			trader.quote_batch_size = 1
+			quotes = trader.quotes(['aapl', 'msft', 'amzn', 'goog', 'tsla'] * 4)
 
-		for str_func in funcs:
-			function = getattr(self.trader, str_func)
+			assert all(isinstance(quote, Quote) for quote in quotes)
+			assert server.api.connections == 1  # the concurrent requests were multiplexed
 
 	#  TODO -- add testing for buying or selling
 	#  Maybe only test limit orders to avoid execution?
 
 	def test_historical_data(self):
-		quotes = self.trader.historical_quotes('aapl')
+		quotes = self.trader.historical_quotes('aapl', '5minute', 'day')
 		assert(len(quotes) > 10)  # length will be in 100s
 
-		historical_quote = quotes[0]
+		historical_quote = quotes.iloc[0]
 		# test properties
 		high = historical_quote.high
 		low = historical_quote.low
 		close = historical_quote.close
 		open = historical_quote.open
-		time = historical_quote.time
+		time = quotes.index[0]
 
 		import pandas as pd
 		assert (isinstance(time, pd.Timestamp))